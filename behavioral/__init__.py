@@ -0,0 +1,97 @@
+"""
+Поведенческие паттерны проектирования.
+
+Модули и классы пакета импортируются лениво, при первом обращении к
+атрибуту. Имена, которые встречаются в нескольких модулях пакета
+(например, `Application`), доступны только через модуль.
+"""
+
+import importlib
+
+
+_modules = (
+    'chain_of_responsibility',
+    'command',
+    'interpretator',
+    'iterator',
+    'mediator',
+    'memento',
+    'observer',
+    'state',
+    'strategy',
+    'template_method',
+    'visitor',
+)
+
+# Имя класса или функции -> модуль, в котором оно объявлено
+_exports = {
+    'ComponentWithContextualHelp': 'chain_of_responsibility',
+    'Container': 'chain_of_responsibility',
+    'Panel': 'chain_of_responsibility',
+    'Dialog': 'chain_of_responsibility',
+    'CopyCommand': 'command',
+    'CutCommand': 'command',
+    'PasteCommand': 'command',
+    'UndoCommand': 'command',
+    'CommandHistory': 'command',
+    'RomanNumeralInterpret': 'interpretator',
+    'SocialNetwork': 'iterator',
+    'Facebook': 'iterator',
+    'ProfileIterator': 'iterator',
+    'FacebookIterator': 'iterator',
+    'SocialSpammer': 'iterator',
+    'Profile': 'iterator',
+    'Mediator': 'mediator',
+    'AuthenticationDialog': 'mediator',
+    'Textbox': 'mediator',
+    'Checkbox': 'mediator',
+    'Snapshot': 'memento',
+    'File': 'observer',
+    'EventManager': 'observer',
+    'EventListener': 'observer',
+    'LoggingListener': 'observer',
+    'EmailAlertsListener': 'observer',
+    'State': 'state',
+    'LockedState': 'state',
+    'ReadyState': 'state',
+    'PlayingState': 'state',
+    'AudioPlayer': 'state',
+    'Strategy': 'strategy',
+    'ConcreteStrategyAdd': 'strategy',
+    'ConcreteStrategySubtract': 'strategy',
+    'ConcreteStrategyMultiply': 'strategy',
+    'Context': 'strategy',
+    'ExampleApplication': 'strategy',
+    'Enemy': 'template_method',
+    'Map': 'template_method',
+    'GameAI': 'template_method',
+    'OrcsAI': 'template_method',
+    'MonstersAI': 'template_method',
+    'Shape': 'visitor',
+    'Dot': 'visitor',
+    'Circle': 'visitor',
+    'Rectangle': 'visitor',
+    'CompoundShape': 'visitor',
+    'Visitor': 'visitor',
+    'XMLExportVisitor': 'visitor',
+}
+
+__all__ = [*_modules, *_exports]
+
+
+def __getattr__(name: str) -> object:
+    if name in _modules:
+        return importlib.import_module(f'.{name}', __name__)
+
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    # Следующие обращения не проходят через __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
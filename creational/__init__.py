@@ -0,0 +1,110 @@
+"""
+Порождающие паттерны проектирования.
+
+Модули и классы пакета импортируются лениво, при первом обращении к
+атрибуту. Имена, которые встречаются в нескольких модулях пакета
+(например, `Application`), доступны только через модуль.
+"""
+
+import importlib
+
+
+_modules = (
+    'abstract_factory',
+    'abstract_factory_mac',
+    'abstract_factory_win',
+    'builder',
+    'fabric_method',
+    'prototype',
+    'singleton',
+)
+
+# Имя класса или функции -> модуль, в котором оно объявлено
+_exports = {
+    'Checkbox': 'abstract_factory',
+    'GUIFactory': 'abstract_factory',
+    'WinButton': 'abstract_factory_win',
+    'WinCheckbox': 'abstract_factory_win',
+    'WinFactory': 'abstract_factory_win',
+    'MacButton': 'abstract_factory_mac',
+    'MacCheckbox': 'abstract_factory_mac',
+    'MacFactory': 'abstract_factory_mac',
+    'WidgetPool': 'abstract_factory',
+    'PooledGUIFactory': 'abstract_factory',
+    'GUIFactoryRegistry': 'abstract_factory',
+    'ApplicationConfigurator': 'abstract_factory',
+    'Engine': 'builder',
+    'DefaultEngine': 'builder',
+    'SportsEngine': 'builder',
+    'TripComputer': 'builder',
+    'GPS': 'builder',
+    'Car': 'builder',
+    'Manual': 'builder',
+    'CarManual': 'builder',
+    'Builder': 'builder',
+    'CarBuilder': 'builder',
+    'CarManualBuilder': 'builder',
+    'FrozenDefaultEngine': 'builder',
+    'FrozenSportsEngine': 'builder',
+    'FrozenTripComputer': 'builder',
+    'FrozenGPS': 'builder',
+    'FrozenCar': 'builder',
+    'FrozenCarManual': 'builder',
+    'ManualRenderer': 'builder',
+    'intern_component': 'builder',
+    'freeze_engine': 'builder',
+    'FrozenCarBuilder': 'builder',
+    'FrozenCarManualBuilder': 'builder',
+    'Director': 'builder',
+    'ConstructionPlan': 'builder',
+    'build_many': 'builder',
+    'make_car': 'builder',
+    'WindowsButton': 'fabric_method',
+    'HTMLButton': 'fabric_method',
+    'Dialog': 'fabric_method',
+    'WindowsDialog': 'fabric_method',
+    'WebDialog': 'fabric_method',
+    'render_many': 'fabric_method',
+    'Shape': 'prototype',
+    'Rectangle': 'prototype',
+    'Circle': 'prototype',
+    'PrototypeRegistry': 'prototype',
+    'SlottedShape': 'prototype',
+    'SlottedRectangle': 'prototype',
+    'SlottedCircle': 'prototype',
+    'clone_many': 'prototype',
+    'RectangleView': 'prototype',
+    'CircleView': 'prototype',
+    'ShapeStore': 'prototype',
+    'business_logic': 'prototype',
+    'Singleton': 'singleton',
+    'Multiton': 'singleton',
+    'PoolTimeoutError': 'singleton',
+    'PoolClosedError': 'singleton',
+    'PoolStats': 'singleton',
+    'ConnectionPool': 'singleton',
+    'CacheStats': 'singleton',
+    'QueryCache': 'singleton',
+    'Database': 'singleton',
+    'NamedDatabase': 'singleton',
+}
+
+__all__ = [*_modules, *_exports]
+
+
+def __getattr__(name: str) -> object:
+    if name in _modules:
+        return importlib.import_module(f'.{name}', __name__)
+
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    # Следующие обращения не проходят через __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
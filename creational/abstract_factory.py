@@ -4,8 +4,12 @@
 не привязываясь к конкретным классам создаваемых объектов.
 """
 
+import importlib
+import os
+import sys
 from abc import abstractmethod
-from typing import Protocol
+from collections.abc import Callable
+from typing import Any, Protocol
 
 
 class Button(Protocol):
@@ -14,32 +18,12 @@ class Button(Protocol):
         raise NotImplementedError
 
 
-class WinButton(Button):
-    def paint(self) -> None:
-        """Отрисовать кнопку в стиле Windows"""
-
-
-class MacButton(Button):
-    def paint(self) -> None:
-        """Отрисовать кнопку в стиле macOS"""
-
-
 class Checkbox(Protocol):
     @abstractmethod
     def paint(self) -> None:
         raise NotImplementedError
 
 
-class WinCheckbox(Checkbox):
-    def paint(self) -> None:
-        """Отрисовать чекбокс в стиле Windows"""
-
-
-class MacCheckbox(Checkbox):
-    def paint(self) -> None:
-        """Отрисовать чекбокс в стиле macOS"""
-
-
 class GUIFactory(Protocol):
     """Абстрактная фабрика знает обо всех абстрактных типах продуктов"""
 
@@ -52,24 +36,205 @@ class GUIFactory(Protocol):
         raise NotImplementedError
 
 
-class WinFactory(GUIFactory):
+# Конкретные семейства продуктов лежат в отдельных модулях и импортируются
+# только при первом обращении: через реестр `gui_factories` или как атрибут
+# этого модуля
+_prefix = f'{__package__}.' if __package__ else ''
+_families = {
+    'WinButton': 'abstract_factory_win',
+    'WinCheckbox': 'abstract_factory_win',
+    'WinFactory': 'abstract_factory_win',
+    'MacButton': 'abstract_factory_mac',
+    'MacCheckbox': 'abstract_factory_mac',
+    'MacFactory': 'abstract_factory_mac',
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _families.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(importlib.import_module(_prefix + module_name), name)
+
+
+class WidgetPool:
+    """
+    Пул виджетов одного типа.
+
+    Освобождённые виджеты попадают в ограниченный список свободных и
+    выдаются повторно вместо создания новых. Перед повторной выдачей
+    вызывается `reset`, чтобы сбросить состояние прошлого владельца.
+    Выданные виджеты пул помнит до возврата, поэтому чужой или уже
+    возвращённый виджет вернуть нельзя.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[], Any],
+        max_free: int = 64,
+        reset: Callable[[Any], None] | None = None,
+    ) -> None:
+        self._create = create
+        self._free: list[Any] = []
+        self._in_use: dict[int, Any] = {}
+        self.max_free = max_free
+        self.reset = reset
+
+        # Счётчики: создано, выдано повторно, возвращено, отброшено из-за
+        # переполнения списка свободных
+        self.allocated = 0
+        self.reused = 0
+        self.released = 0
+        self.dropped = 0
+
+    def acquire(self) -> Any:
+        if self._free:
+            widget = self._free.pop()
+            if self.reset is not None:
+                self.reset(widget)
+            self.reused += 1
+        else:
+            widget = self._create()
+            self.allocated += 1
+
+        self._in_use[id(widget)] = widget
+        return widget
+
+    def owns(self, widget: Any) -> bool:
+        """Виджет выдан этим пулом и ещё не возвращён"""
+
+        return self._in_use.get(id(widget)) is widget
+
+    def release(self, widget: Any) -> None:
+        if not self.owns(widget):
+            raise ValueError(
+                f'{widget!r} was not acquired from this pool '
+                'or was already released'
+            )
+        del self._in_use[id(widget)]
+
+        self.released += 1
+        if len(self._free) < self.max_free:
+            self._free.append(widget)
+        else:
+            self.dropped += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'allocated': self.allocated,
+            'reused': self.reused,
+            'released': self.released,
+            'dropped': self.dropped,
+            'free': len(self._free),
+            'in_use': len(self._in_use),
+        }
+
+
+class PooledGUIFactory(GUIFactory):
+    """
+    Фабрика, выдающая продукты из пулов.
+
+    Оборачивает любую фабрику. Клиент возвращает ненужные виджеты через
+    `release`, а следующий `create_*` выдаст их повторно. Функции сброса
+    задаются по имени продукта: `button`, `checkbox`.
+    """
+
+    def __init__(
+        self,
+        factory: GUIFactory,
+        max_free: int = 64,
+        reset_hooks: dict[str, Callable[[Any], None]] | None = None,
+    ) -> None:
+        reset_hooks = reset_hooks or {}
+        self._pools = {
+            'button': WidgetPool(
+                factory.create_button, max_free, reset_hooks.get('button')
+            ),
+            'checkbox': WidgetPool(
+                factory.create_checkbox, max_free, reset_hooks.get('checkbox')
+            ),
+        }
+
     def create_button(self) -> Button:
-        return WinButton()
+        return self._acquire('button')
 
     def create_checkbox(self) -> Checkbox:
-        return WinCheckbox()
+        return self._acquire('checkbox')
 
+    def release(self, widget: Button | Checkbox) -> None:
+        for pool in self._pools.values():
+            if pool.owns(widget):
+                pool.release(widget)
+                return
+        raise ValueError(
+            f'{widget!r} was not created by this factory '
+            'or was already released'
+        )
 
-# Несмотря на то, что фабрики оперируют конкретными классами,
-# их методы возвращают абстрактные типы продуктов.
-# Благодаря этому фабрики можно взаимозаменять, не изменяя
-# клиентский код
-class MacFactory(GUIFactory):
-    def create_button(self) -> Button:
-        return MacButton()
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def _acquire(self, product: str) -> Any:
+        return self._pools[product].acquire()
 
-    def create_checkbox(self) -> Checkbox:
-        return MacCheckbox()
+
+class GUIFactoryRegistry:
+    """
+    Реестр фабрик семейств продуктов.
+
+    Фабрика регистрируется по имени строкой пути `module:Class` (или
+    `module.Class`) и импортируется только при первом запросе, после чего
+    экземпляр кэшируется. Имена, которых нет в реестре, ищутся среди точек
+    входа пакетов в группе `entry_point_group`.
+    """
+
+    def __init__(
+        self, entry_point_group: str = 'python_patterns.gui_factories'
+    ) -> None:
+        self.entry_point_group = entry_point_group
+        self._paths: dict[str, str] = {}
+        self._factories: dict[str, GUIFactory] = {}
+
+    def register(self, name: str, path: str) -> None:
+        self._paths[name] = path
+        self._factories.pop(name, None)
+
+    def names(self) -> list[str]:
+        return sorted(self._paths)
+
+    def get(self, name: str) -> GUIFactory:
+        factory = self._factories.get(name)
+        if factory is None:
+            factory_cls = self._load(name)
+            factory = self._factories[name] = factory_cls()
+        return factory
+
+    def _load(self, name: str) -> type[GUIFactory]:
+        path = self._paths.get(name)
+        if path is None:
+            return self._load_entry_point(name)
+
+        module_name, sep, attr = path.partition(':')
+        if not sep:
+            module_name, _, attr = path.rpartition('.')
+        return getattr(importlib.import_module(module_name), attr)
+
+    def _load_entry_point(self, name: str) -> type[GUIFactory]:
+        # importlib.metadata сканирует установленные пакеты, поэтому
+        # импортируется только когда имя не нашлось в реестре
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=self.entry_point_group):
+            if entry_point.name == name:
+                self._paths[name] = entry_point.value
+                return entry_point.load()
+
+        raise Exception('Error! Unknown operating system.')
+
+
+gui_factories = GUIFactoryRegistry()
+gui_factories.register('Windows', f'{_prefix}abstract_factory_win:WinFactory')
+gui_factories.register('Mac', f'{_prefix}abstract_factory_mac:MacFactory')
 
 
 class Application:
@@ -90,12 +255,82 @@ class ApplicationConfigurator:
     def main(self) -> None:
         self.config = input()
 
-        match self.config:
-            case 'Windows':
-                factory = WinFactory()
-            case 'Mac':
-                factory = MacFactory()
-            case _:
-                raise Exception('Error! Unknown operating system.')
+        factory = gui_factories.get(self.config)
 
         self.app: Application = Application(factory)
+
+
+def _import_times(code: str) -> dict[str, int]:
+    """Накопленное время импорта (мкс) модулей верхнего уровня"""
+
+    # Импорт здесь, чтобы не увеличивать время импорта самого модуля
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split('|')
+        # Учитываются только модули верхнего уровня: время вложенных
+        # импортов уже входит в их накопленное время
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def benchmark_import_time(repeat: int = 5) -> None:
+    """
+    Время импорта сверх запуска интерпретатора.
+
+    Модули, которые интерпретатор импортирует при старте, не учитываются, а
+    из `repeat` запусков берётся лучший
+    """
+
+    startup = set(_import_times('pass'))
+    cases = {
+        'eager import of both families': (
+            'import abstract_factory, abstract_factory_win, '
+            'abstract_factory_mac'
+        ),
+        'lazy import': 'import abstract_factory',
+        'lazy import + Windows factory': (
+            'import abstract_factory as m; m.gui_factories.get("Windows")'
+        ),
+        'lazy import + entry point scan': (
+            'import importlib.metadata as md; import abstract_factory; '
+            'md.entry_points(group="python_patterns.gui_factories")'
+        ),
+    }
+    for name, code in cases.items():
+        best = min(
+            sum(
+                elapsed for module, elapsed in _import_times(code).items()
+                if module not in startup
+            )
+            for _ in range(repeat)
+        )
+        print(f'{name}: {best} us')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['bench']:
+        benchmark_import_time()
+        sys.exit()
+
+    configurator = ApplicationConfigurator()
+    configurator.main()
+    configurator.app.create_ui()
+    configurator.app.paint()
+
+    pooled = PooledGUIFactory(gui_factories.get(configurator.config))
+    for _ in range(1000):
+        buttons = [pooled.create_button() for _ in range(10)]
+        for button in buttons:
+            pooled.release(button)
+    print(pooled.stats())
@@ -0,0 +1,33 @@
+"""
+Семейство продуктов в стиле macOS.
+
+Модуль импортируется реестром `gui_factories` только при первом запросе
+фабрики `Mac`
+"""
+
+if __package__:
+    from .abstract_factory import Button, Checkbox, GUIFactory
+else:
+    from abstract_factory import Button, Checkbox, GUIFactory
+
+
+class MacButton(Button):
+    def paint(self) -> None:
+        """Отрисовать кнопку в стиле macOS"""
+
+
+class MacCheckbox(Checkbox):
+    def paint(self) -> None:
+        """Отрисовать чекбокс в стиле macOS"""
+
+
+# Несмотря на то, что фабрики оперируют конкретными классами,
+# их методы возвращают абстрактные типы продуктов.
+# Благодаря этому фабрики можно взаимозаменять, не изменяя
+# клиентский код
+class MacFactory(GUIFactory):
+    def create_button(self) -> Button:
+        return MacButton()
+
+    def create_checkbox(self) -> Checkbox:
+        return MacCheckbox()
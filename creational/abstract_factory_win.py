@@ -0,0 +1,29 @@
+"""
+Семейство продуктов в стиле Windows.
+
+Модуль импортируется реестром `gui_factories` только при первом запросе
+фабрики `Windows`
+"""
+
+if __package__:
+    from .abstract_factory import Button, Checkbox, GUIFactory
+else:
+    from abstract_factory import Button, Checkbox, GUIFactory
+
+
+class WinButton(Button):
+    def paint(self) -> None:
+        """Отрисовать кнопку в стиле Windows"""
+
+
+class WinCheckbox(Checkbox):
+    def paint(self) -> None:
+        """Отрисовать чекбокс в стиле Windows"""
+
+
+class WinFactory(GUIFactory):
+    def create_button(self) -> Button:
+        return WinButton()
+
+    def create_checkbox(self) -> Checkbox:
+        return WinCheckbox()
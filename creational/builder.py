@@ -4,8 +4,16 @@
 представлений объектов
 """
 
+import copy
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Hashable, Iterable
+import dataclasses
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Any, Protocol, TextIO, TypeVar
 
 
 class Engine(Protocol):
@@ -198,6 +206,198 @@ class CarManualBuilder(Builder):
         return self._manual
 
 
+# Неизменяемые компактные версии продуктов и их компонентов. Одинаковые
+# компоненты можно хранить в одном экземпляре на все автомобили: изменить их
+# всё равно нельзя.
+@dataclass(frozen=True, slots=True)
+class FrozenDefaultEngine:
+    horsepower: int = 150
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenSportsEngine:
+    horsepower: int = 800
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenTripComputer:
+    name: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenGPS:
+    model: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenCar:
+    seats: int | None = None
+    engine: Engine | None = None
+    trip_computer: FrozenTripComputer | None = None
+    gps: FrozenGPS | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenCarManual:
+    seats: int = 0
+    engine: Engine | None = None
+    trip_computer: FrozenTripComputer | None = None
+    gps: FrozenGPS | None = None
+
+    # Текст руководства собирается так же, как у `CarManual`
+    read_seats = CarManual.read_seats
+    read_engine = CarManual.read_engine
+    read_trip_computer = CarManual.read_trip_computer
+    read_gps = CarManual.read_gps
+    info = CarManual.info
+
+
+class ManualRenderer:
+    """
+    Потоковая запись руководств в файл.
+
+    Строки руководства зависят только от одного поля компонента (мощности
+    двигателя, модели GPS и т.д.), поэтому каждая строка собирается один раз
+    на значение поля и дальше берётся из кэша. Готовый текст копится в буфере
+    и пишется в файл кусками не меньше `chunk_size` символов.
+    """
+
+    def __init__(self, chunk_size: int = 2 ** 20) -> None:
+        self.chunk_size = chunk_size
+        self._seats: dict[int, str] = {}
+        self._engines: dict[int | None, str] = {}
+        self._trip_computers: dict[str | None, str] = {}
+        self._gps: dict[str | None, str] = {}
+
+    def render(self, manual: Manual) -> str:
+        """Текст руководства, совпадающий с `manual.info()`"""
+
+        seats = manual.seats
+        seats_line = self._seats.get(seats)
+        if seats_line is None:
+            seats_line = self._seats[seats] = CarManual(seats).read_seats
+
+        engine = manual.engine
+        key = None if engine is None else engine.horsepower
+        engine_line = self._engines.get(key)
+        if engine_line is None:
+            engine_line = self._engines[key] = CarManual(
+                engine=engine
+            ).read_engine
+
+        trip_computer = manual.trip_computer
+        key = None if trip_computer is None else trip_computer.name
+        trip_computer_line = self._trip_computers.get(key)
+        if trip_computer_line is None:
+            trip_computer_line = self._trip_computers[key] = CarManual(
+                trip_computer=trip_computer
+            ).read_trip_computer
+
+        gps = manual.gps
+        key = None if gps is None else gps.model
+        gps_line = self._gps.get(key)
+        if gps_line is None:
+            gps_line = self._gps[key] = CarManual(gps=gps).read_gps
+
+        return f'{seats_line}\n{engine_line}\n{trip_computer_line}\n{gps_line}'
+
+    def write_many(
+        self, manuals: Iterable[Manual], out: TextIO, separator: str = '\n\n'
+    ) -> int:
+        """Записать руководства через `separator`, вернуть число символов"""
+
+        render = self.render
+        buffer: list[str] = []
+        buffered = written = 0
+
+        for manual in manuals:
+            text = render(manual)
+            buffer.append(text)
+            buffer.append(separator)
+            buffered += len(text) + len(separator)
+
+            if buffered >= self.chunk_size:
+                out.write(''.join(buffer))
+                written += buffered
+                buffer.clear()
+                buffered = 0
+
+        if buffer:
+            out.write(''.join(buffer))
+            written += buffered
+        return written
+
+
+_Component = TypeVar('_Component', bound=Hashable)
+
+# Таблица интернирования: каждый различный компонент хранится один раз
+_interned: dict[Hashable, Hashable] = {}
+
+
+def intern_component(component: _Component) -> _Component:
+    # Изменяемый компонент делить нельзя, да и хешировать обычно тоже
+    if not _is_frozen(component):
+        return component
+    return _interned.setdefault(component, component)
+
+
+_FROZEN_ENGINES: dict[type, type] = {
+    DefaultEngine: FrozenDefaultEngine,
+    SportsEngine: FrozenSportsEngine,
+}
+
+
+def freeze_engine(engine: Engine) -> Engine:
+    # Наследники известных двигателей замораживаются по ближайшему предку
+    for cls in type(engine).__mro__:
+        frozen_type = _FROZEN_ENGINES.get(cls)
+        if frozen_type is not None:
+            engine = frozen_type(engine.horsepower)
+            break
+    return intern_component(engine)
+
+
+class FrozenCarBuilder(Builder):
+    """
+    Строитель неизменяемых автомобилей.
+
+    Шаги только запоминают значения полей, а сам автомобиль создаётся в
+    `get_result`. Все компоненты берутся из таблицы интернирования.
+    """
+
+    product: type = FrozenCar
+    _fields: dict[str, Any]
+
+    def reset(self) -> None:
+        self._fields = {}
+
+    def set_seats(self, seats: int) -> None:
+        self._fields['seats'] = seats
+
+    def set_engine(self, engine: Engine) -> None:
+        self._fields['engine'] = freeze_engine(engine)
+
+    def set_trip_computer(
+        self, trip_computer: bool, name: str = 'unknown'
+    ) -> None:
+        self._fields['trip_computer'] = (
+            intern_component(FrozenTripComputer(name))
+            if trip_computer else None
+        )
+
+    def set_gps(self, gps: bool, model: str = 'unknown') -> None:
+        self._fields['gps'] = (
+            intern_component(FrozenGPS(model)) if gps else None
+        )
+
+    def get_result(self) -> Any:
+        return self.product(**self._fields)
+
+
+class FrozenCarManualBuilder(FrozenCarBuilder):
+    product = FrozenCarManual
+
+
 # Директор знает, в какой последовательности нужно заставлять работать
 # строителя, чтобы получить ту или иную версию продукта.
 # Директор работает со строителем через общий интерфейс, благодаря чему он не
@@ -210,6 +410,117 @@ class Director:
         builder.set_trip_computer(True)
         builder.set_gps(True)
 
+    def compile(
+        self, recipe: Callable[[Builder], None]
+    ) -> 'ConstructionPlan':
+        """
+        Записать рецепт директора в план строительства.
+
+        Рецепт выполняется один раз над записывающим строителем, поэтому
+        компоненты, которые он создаёт (например, `SportsEngine()`), создаются
+        один раз. Неизменяемые компоненты затем делят все продукты плана, а
+        изменяемые копируются для каждого продукта.
+        """
+
+        recorder = _PlanRecorder()
+        recipe(recorder)
+        return ConstructionPlan(tuple(recorder.steps))
+
+
+@dataclass(frozen=True)
+class ConstructionPlan:
+    """Последовательность шагов строителя: имя метода и его аргументы"""
+
+    steps: tuple[tuple[str, tuple], ...]
+
+    def apply(self, builder: Builder) -> None:
+        for name, args in self.steps:
+            getattr(builder, name)(*map(_own_copy, args))
+
+
+# Значения этих типов нельзя изменить на месте
+_IMMUTABLE = (int, float, complex, str, bytes, bool, type(None), frozenset)
+
+
+def _is_frozen(value: Any) -> bool:
+    """Значение неизменяемо, и его можно делить между продуктами"""
+
+    if isinstance(value, _IMMUTABLE):
+        return True
+    params = getattr(type(value), '__dataclass_params__', None)
+    return params is not None and params.frozen and all(
+        _is_frozen(getattr(value, field.name))
+        for field in dataclasses.fields(value)
+    )
+
+
+def _own_copy(value: Any) -> Any:
+    """Поверхностная копия изменяемого компонента, неизменяемый - как есть"""
+
+    return value if _is_frozen(value) else copy.copy(value)
+
+
+class _PlanRecorder:
+    """Строитель, который только запоминает вызовы своих шагов"""
+
+    def __init__(self) -> None:
+        self.steps: list[tuple[str, tuple]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        def step(*args: Any) -> None:
+            self.steps.append((name, args))
+        return step
+
+
+def build_many(plan: ConstructionPlan, builder: Builder, n: int) -> list[Any]:
+    """
+    Построить `n` продуктов по плану.
+
+    Шаги плана выполняются над строителем один раз, остальные продукты -
+    копии первого. Неизменяемые компоненты у всех продуктов общие, а
+    изменяемые (двигатель, GPS и т.д.) у каждого продукта свои.
+    """
+
+    if n <= 0:
+        return []
+
+    plan.apply(builder)
+    product = builder.get_result()
+
+    # Неизменяемый продукт можно просто разделить между всеми
+    if _is_frozen(product):
+        return [product] * n
+
+    if not hasattr(product, '__dict__'):
+        # Продукт со слотами: копия и её изменяемые поля по одному. Запись в
+        # обход `__setattr__`, потому что замороженный продукт тоже может
+        # ссылаться на изменяемый компонент
+        owned = [
+            (field.name, getattr(product, field.name))
+            for field in dataclasses.fields(product)
+            if not _is_frozen(getattr(product, field.name))
+        ]
+        products = [product]
+        for _ in range(n - 1):
+            product_copy = copy.copy(product)
+            for name, value in owned:
+                object.__setattr__(product_copy, name, copy.copy(value))
+            products.append(product_copy)
+        return products
+
+    cls, state = type(product), vars(product)
+    owned = [name for name, value in state.items() if not _is_frozen(value)]
+    new = object.__new__
+    products = [product]
+    for _ in range(n - 1):
+        product_copy = new(cls)
+        copy_state = product_copy.__dict__
+        copy_state.update(state)
+        for name in owned:
+            copy_state[name] = copy.copy(state[name])
+        products.append(product_copy)
+    return products
+
 
 def make_car() -> tuple[Car, CarManual]:
     director: Director = Director()
@@ -225,11 +536,87 @@ def make_car() -> tuple[Car, CarManual]:
     return car, manual
 
 
+def _traced_size(build: Callable[[], list]) -> int:
+    tracemalloc.start()
+    products = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del products
+    return size
+
+
+def benchmark_memory(count: int = 1_000_000) -> None:
+    director = Director()
+
+    def build(builder: Builder) -> list:
+        cars = []
+        for _ in range(count):
+            director.construct_sports_car(builder)
+            cars.append(builder.get_result())
+        return cars
+
+    before = _traced_size(lambda: build(CarBuilder()))
+    after = _traced_size(lambda: build(FrozenCarBuilder()))
+    print(
+        f'{count} cars: CarBuilder {before / 2 ** 20:.1f} MiB, '
+        f'FrozenCarBuilder {after / 2 ** 20:.1f} MiB'
+    )
+
+
+def benchmark_render(count: int = 1_000_000) -> None:
+    director = Director()
+    plan = director.compile(director.construct_sports_car)
+    manuals = build_many(plan, CarManualBuilder(), count)
+
+    def concatenate(out: TextIO) -> None:
+        text = ''
+        for manual in manuals:
+            text += manual.info() + '\n\n'
+        out.write(text)
+
+    def stream(out: TextIO) -> None:
+        ManualRenderer().write_many(manuals, out)
+
+    for name, render in (('info() loop', concatenate), ('renderer', stream)):
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', delete=False
+        ) as out:
+            start = time.perf_counter()
+            render(out)
+            out.flush()
+            elapsed = time.perf_counter() - start
+
+        size = os.path.getsize(out.name)
+        os.remove(out.name)
+        print(f'{name}: {size / 2 ** 20 / elapsed:.1f} MB/s')
+
+
 if __name__ == '__main__':
+    if sys.argv[1:] == ['bench']:
+        benchmark_memory()
+        benchmark_render()
+        sys.exit()
+
     car, car_manual = make_car()
 
     print(car, car_manual.info(), sep='\n')
 
+    director = Director()
+    plan = director.compile(director.construct_sports_car)
+    cars = build_many(plan, CarBuilder(), 1000)
+    manuals = build_many(plan, CarManualBuilder(), 1000)
+    assert cars[0] == car and manuals[-1] == car_manual
+    assert cars[0].engine == cars[-1].engine
+    assert cars[0].engine is not cars[-1].engine
+    assert cars[0].engine is not manuals[0].engine
+
+    frozen_manual = build_many(plan, FrozenCarManualBuilder(), 1)[0]
+    assert frozen_manual.info() == car_manual.info()
+
+    renderer = ManualRenderer()
+    assert renderer.render(frozen_manual) == car_manual.info()
+    renderer.write_many(manuals[:2], sys.stdout)
+
 
 """
 Применимость.
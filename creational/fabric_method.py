@@ -15,8 +15,10 @@
 """
 
 
+import sys
 from abc import abstractmethod
-from typing import Any
+from collections.abc import Iterable
+from typing import Any, TextIO
 
 
 class Button:
@@ -70,6 +72,28 @@ class WebDialog(Dialog):
         return HTMLButton()
 
 
+def render_many(dialogs: Iterable[Dialog], writer: TextIO) -> None:
+    """
+    Отрисовать диалоги в `writer`, по строке на диалог.
+
+    Кнопка создаётся и отрисовывается один раз на каждую конкретную фабрику
+    диалогов, остальные диалоги той же фабрики получают готовый фрагмент.
+    Фрагменты пишутся сразу, без сборки общей строки.
+    """
+
+    fragments: dict[type[Dialog], str] = {}
+
+    for dialog in dialogs:
+        fragment = fragments.get(type(dialog))
+        if fragment is None:
+            button: Button = dialog.create_button()
+            button.on_click('close_dialog')
+            fragment = fragments[type(dialog)] = (
+                f'{button.render(None, None)}\n'
+            )
+        writer.write(fragment)
+
+
 class Application:
     dialog: Dialog
 
@@ -88,3 +112,7 @@ class Application:
     def main(self) -> None:
         self.initialize()
         self.dialog.render()
+
+
+if __name__ == '__main__':
+    render_many([WebDialog(), WindowsDialog(), WebDialog()], sys.stdout)
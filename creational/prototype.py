@@ -2,7 +2,20 @@
 Прототип - паттерн, который позволяет копировать объекты, не вдаваясь
 в подробности их реализации
 """
+import copy
+import sys
+import time
+import tracemalloc
+import weakref
 from abc import ABCMeta, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from itertools import repeat, starmap
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
 
 
 class Shape(metaclass=ABCMeta):
@@ -12,17 +25,152 @@ class Shape(metaclass=ABCMeta):
     Y: int
     color: str
 
-    def __init__(self, source: 'Shape') -> None:
+    # Поля состояния фигуры, которые копируются при клонировании
+    fields: tuple[str, ...] = ('X', 'Y', 'color')
+
+    def __init__(self, source: 'Shape | None' = None) -> None:
         """Инициализация прототипа"""
 
-        self.X = source.X
-        self.Y = source.Y
-        self.color = source.color
+        if source is not None:
+            self.X = source.X
+            self.Y = source.Y
+            self.color = source.color
 
     @abstractmethod
     def clone(self) -> 'Shape':
         ...
 
+    # Клонирование с копированием при записи. Клон получает снимок полей
+    # источника в общем словаре состояния и читает поля напрямую из него.
+    # Собственную копию состояния клон делает только при первой записи, а
+    # сам источник при этом не меняется. Пока поля источника те же, новые
+    # клоны делят один и тот же снимок.
+    def cow_clone(self, on_diverge: Callable[[], None] | None = None) -> Any:
+        snapshot = _cow_snapshots.get(id(self))
+        if (
+            snapshot is None or
+            snapshot[1] is not on_diverge or
+            not _same_fields(snapshot[0], self.__dict__)
+        ):
+            snapshot = _cow_snapshot(self, on_diverge)
+
+        clone = _new(snapshot[3])
+        _set_state(clone, '__dict__', snapshot[2])
+        return clone
+
+    @property
+    def is_shared(self) -> bool:
+        """Клон всё ещё делит состояние с другими клонами"""
+
+        return '_cow_on_diverge' in self.__dict__
+
+
+def _cow_state(
+    shape: Shape, on_diverge: Callable[[], None] | None = None
+) -> dict[str, Any]:
+    """Снимок полей фигуры, который делят её клоны"""
+
+    state = dict(shape.__dict__)
+    # Служебный ключ заодно отмечает словарь как общий
+    state['_cow_on_diverge'] = on_diverge
+    return state
+
+
+# Последний снимок каждого источника: id -> (копия полей, on_diverge,
+# общее состояние клонов, класс клонов). Запись удаляется вместе с
+# источником
+_Snapshot = tuple[dict[str, Any], Any, dict[str, Any], type]
+_cow_snapshots: dict[int, _Snapshot] = {}
+
+
+def _cow_snapshot(
+    shape: Shape, on_diverge: Callable[[], None] | None
+) -> _Snapshot:
+    key = id(shape)
+    if key not in _cow_snapshots:
+        weakref.finalize(shape, _cow_snapshots.pop, key, None)
+
+    snapshot = _cow_snapshots[key] = (
+        dict(shape.__dict__),
+        on_diverge,
+        _cow_state(shape, on_diverge),
+        _cow_type(type(shape)),
+    )
+    return snapshot
+
+
+def _same_fields(saved: dict[str, Any], current: dict[str, Any]) -> bool:
+    # Сравнение по тождеству: `==` не отличает 1 от 1.0 и True
+    return len(saved) == len(current) and all(
+        current.get(name, _MISSING) is value
+        for name, value in saved.items()
+    )
+
+
+_MISSING = object()
+_new = object.__new__
+# Словарь не копируется: все клоны снимка ссылаются на один объект.
+# Запись идёт в обход `__setattr__` клона, который бы его скопировал
+_set_state = object.__setattr__
+
+
+def _cow_rebuild(cls: type, state: dict[str, Any]) -> Any:
+    shape = _new(cls)
+    shape.__dict__.update(state)
+    return shape
+
+
+class _CopyOnWrite:
+    """
+    Примесь для клонов, которые делят словарь состояния.
+
+    Поля читаются из общего словаря без перехвата. Первая запись или
+    удаление атрибута даёт клону собственную копию словаря, после чего
+    клон становится экземпляром исходного класса.
+    """
+
+    _cow_base: type
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._cow_diverge()
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        self._cow_diverge()
+        object.__delattr__(self, name)
+
+    def __reduce_ex__(self, protocol: int) -> tuple:
+        # Копируется и сериализуется обычная фигура исходного класса
+        return _cow_rebuild, (self._cow_base, self._cow_fields())
+
+    def _cow_fields(self) -> dict[str, Any]:
+        state = dict(self.__dict__)
+        state.pop('_cow_on_diverge', None)
+        return state
+
+    def _cow_diverge(self) -> None:
+        on_diverge = self.__dict__['_cow_on_diverge']
+        object.__setattr__(self, '__dict__', self._cow_fields())
+        object.__setattr__(self, '__class__', self._cow_base)
+        if on_diverge is not None:
+            on_diverge()
+
+
+_cow_types: dict[type, type] = {}
+
+
+def _cow_type(cls: type) -> type:
+    # Клон клона получает класс того же исходного класса
+    cls = getattr(cls, '_cow_base', cls)
+    cow_type = _cow_types.get(cls)
+    if cow_type is None:
+        cow_type = _cow_types[cls] = type(
+            f'Shared{cls.__name__}',
+            (_CopyOnWrite, cls),
+            {'_cow_base': cls, '__module__': cls.__module__},
+        )
+    return cow_type
+
 
 # Конкретный прототип. Метод клонирования создаёт новый объект текущего класса
 # передавая в его конструктор ссылку на собственный объект. Благодаря этому
@@ -35,13 +183,16 @@ class Rectangle(Shape):
     width: int
     height: int
 
-    def __init__(self, source: 'Rectangle') -> None:
+    fields = Shape.fields + ('width', 'height')
+
+    def __init__(self, source: 'Rectangle | None' = None) -> None:
         # Вызов родительского конструктора нужен, чтобы скопировать
         # потенциальные приватные поля, объявленные в родительском классе.
         super().__init__(source)
 
-        self.width = source.width
-        self.height = source.height
+        if source is not None:
+            self.width = source.width
+            self.height = source.height
 
     def clone(self) -> 'Shape':
         return Rectangle(self)
@@ -50,15 +201,352 @@ class Rectangle(Shape):
 class Circle(Shape):
     radius: int
 
-    def __init__(self, source: 'Circle') -> None:
+    fields = Shape.fields + ('radius',)
+
+    def __init__(self, source: 'Circle | None' = None) -> None:
         super().__init__(source)
 
-        self.radius = source.radius
+        if source is not None:
+            self.radius = source.radius
 
     def clone(self) -> 'Circle':
         return Circle(self)
 
 
+class PrototypeRegistry:
+    """
+    Реестр именованных прототипов.
+
+    Клоны создаются с копированием при записи, а реестр считает, сколько из
+    них в итоге изменили и получили собственную копию состояния. Снимок
+    прототипа делается при регистрации и общий для всех его клонов, поэтому
+    после изменения прототипа его нужно зарегистрировать заново.
+    """
+
+    def __init__(self) -> None:
+        self._prototypes: dict[str, tuple[type, dict[str, Any]]] = {}
+        self.clones = 0
+        self.diverged = 0
+
+    def register(self, name: str, prototype: Shape) -> None:
+        self._prototypes[name] = (
+            _cow_type(type(prototype)),
+            _cow_state(prototype, self._on_diverge),
+        )
+
+    def unregister(self, name: str) -> None:
+        del self._prototypes[name]
+
+    def clone(self, name: str) -> Shape:
+        self.clones += 1
+        cow_type, state = self._prototypes[name]
+        clone = _new(cow_type)
+        _set_state(clone, '__dict__', state)
+        return clone
+
+    def _on_diverge(self) -> None:
+        self.diverged += 1
+
+
+# Компактные прототипы. Поля хранятся в слотах, а не в `__dict__`, и
+# передаются конструктору позиционно: клон создаётся одним вызовом вместо
+# цепочки конструкторов, копирующих поля по одному.
+class SlottedShape(metaclass=ABCMeta):
+    __slots__ = ('X', 'Y', 'color')
+
+    # Порядок полей совпадает с порядком аргументов конструктора
+    fields: tuple[str, ...] = __slots__
+
+    def __init__(self, X: int = 0, Y: int = 0, color: str = '') -> None:
+        self.X = X
+        self.Y = Y
+        self.color = color
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.fields)
+
+    def clone(self) -> 'SlottedShape':
+        return type(self)(*self.values())
+
+
+class SlottedRectangle(SlottedShape):
+    __slots__ = ('width', 'height')
+    fields = SlottedShape.fields + __slots__
+
+    def __init__(
+        self,
+        X: int = 0,
+        Y: int = 0,
+        color: str = '',
+        width: int = 0,
+        height: int = 0,
+    ) -> None:
+        # Поля родителя присваиваются здесь же, без вызова его конструктора
+        self.X = X
+        self.Y = Y
+        self.color = color
+        self.width = width
+        self.height = height
+
+    def values(self) -> tuple:
+        return self.X, self.Y, self.color, self.width, self.height
+
+
+class SlottedCircle(SlottedShape):
+    __slots__ = ('radius',)
+    fields = SlottedShape.fields + __slots__
+
+    def __init__(
+        self, X: int = 0, Y: int = 0, color: str = '', radius: int = 0
+    ) -> None:
+        self.X = X
+        self.Y = Y
+        self.color = color
+        self.radius = radius
+
+    def values(self) -> tuple:
+        return self.X, self.Y, self.color, self.radius
+
+
+def clone_many(
+    shapes: Iterable['Shape | SlottedShape'], n: int
+) -> list['Shape | SlottedShape']:
+    """
+    Склонировать каждую фигуру `n` раз.
+
+    Поля компактной фигуры читаются один раз, после чего все `n` клонов
+    создаются пачкой. Для обычных фигур вызывается `clone`.
+    """
+
+    clones: list[Shape | SlottedShape] = []
+
+    for shape in shapes:
+        if isinstance(shape, SlottedShape):
+            clones.extend(starmap(type(shape), repeat(shape.values(), n)))
+        else:
+            clones.extend(shape.clone() for _ in range(n))
+
+    return clones
+
+
+# Колоночное хранилище фигур. Каждый вид фигур - структурированный массив
+# NumPy, цвет хранится номером в общей палитре. Массовые операции выполняются
+# над столбцами целиком, а отдельные строки доступны через представления,
+# которые ведут себя как обычные фигуры.
+SHAPE_DTYPES: dict[str, Any] = {}
+if np is not None:
+    SHAPE_DTYPES = {
+        'rectangle': np.dtype([
+            ('X', 'f8'), ('Y', 'f8'), ('color', 'u4'),
+            ('width', 'f8'), ('height', 'f8'),
+        ]),
+        'circle': np.dtype([
+            ('X', 'f8'), ('Y', 'f8'), ('color', 'u4'), ('radius', 'f8'),
+        ]),
+    }
+
+
+class _RowField:
+    """Поле представления, читающее и пишущее ячейку хранилища"""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, view: Any, owner: type | None = None) -> Any:
+        if view is None:
+            return self
+        value = view._store.column(view.kind, self.name)[view.index]
+        if self.name == 'color':
+            return view._store.colors[value]
+        return value.item()
+
+    def __set__(self, view: Any, value: Any) -> None:
+        if self.name == 'color':
+            value = view._store.color_id(value)
+        view._store.column(view.kind, self.name)[view.index] = value
+
+
+class _ShapeView:
+    """Общая часть представлений строк `ShapeStore`"""
+
+    kind: str
+
+    def __init__(self, store: 'ShapeStore', index: int) -> None:
+        object.__setattr__(self, '_store', store)
+        object.__setattr__(self, 'index', index)
+
+    # Интерфейс фигур посетителя
+    def move(self, x: float, y: float) -> None:
+        self.X += x
+        self.Y += y
+
+    def draw(self) -> None:
+        ...
+
+
+class RectangleView(_ShapeView, Rectangle):
+    kind = 'rectangle'
+
+    X = _RowField()
+    Y = _RowField()
+    color = _RowField()
+    width = _RowField()
+    height = _RowField()
+
+    def accept(self, v: Any) -> None:
+        v.visit_rectangle(self)
+
+
+class CircleView(_ShapeView, Circle):
+    kind = 'circle'
+
+    X = _RowField()
+    Y = _RowField()
+    color = _RowField()
+    radius = _RowField()
+
+    def accept(self, v: Any) -> None:
+        v.visit_circle(self)
+
+
+class ShapeStore:
+    """
+    Колоночное хранилище прямоугольников и окружностей.
+
+    Клон представления (`view.clone()`) - обычная фигура, не связанная с
+    хранилищем.
+    """
+
+    views: dict[str, type[_ShapeView]] = {
+        'rectangle': RectangleView,
+        'circle': CircleView,
+    }
+
+    def __init__(self, colors: list[str] | None = None) -> None:
+        if np is None:
+            raise ImportError('ShapeStore requires numpy')
+
+        self.colors: list[str] = []
+        self._color_ids: dict[str, int] = {}
+        for color in colors or ():
+            self.color_id(color)
+
+        self._rows = {
+            kind: np.empty(0, dtype) for kind, dtype in SHAPE_DTYPES.items()
+        }
+        self._sizes = dict.fromkeys(SHAPE_DTYPES, 0)
+
+    def __len__(self) -> int:
+        return sum(self._sizes.values())
+
+    def __iter__(self) -> Iterator[_ShapeView]:
+        for kind in SHAPE_DTYPES:
+            yield from self.iter_kind(kind)
+
+    def iter_kind(self, kind: str) -> Iterator[_ShapeView]:
+        view = self.views[kind]
+        for index in range(self._sizes[kind]):
+            yield view(self, index)
+
+    def color_id(self, color: str) -> int:
+        color_id = self._color_ids.get(color)
+        if color_id is None:
+            color_id = self._color_ids[color] = len(self.colors)
+            self.colors.append(color)
+        return color_id
+
+    def rows(self, kind: str) -> Any:
+        """Структурированный массив фигур одного вида (без копирования)"""
+
+        return self._rows[kind][:self._sizes[kind]]
+
+    def column(self, kind: str, name: str) -> Any:
+        return self._rows[kind][name][:self._sizes[kind]]
+
+    def append(self, kind: str, **values: Any) -> _ShapeView:
+        index = self._reserve(kind, 1)
+        values['color'] = self.color_id(values.get('color', ''))
+        row = self._rows[kind][index]
+        for name, value in values.items():
+            row[name] = value
+        return self.views[kind](self, index)
+
+    def add_rectangle(
+        self, X: float, Y: float, color: str, width: float, height: float
+    ) -> RectangleView:
+        return self.append(
+            'rectangle', X=X, Y=Y, color=color, width=width, height=height
+        )
+
+    def add_circle(
+        self, X: float, Y: float, color: str, radius: float
+    ) -> CircleView:
+        return self.append('circle', X=X, Y=Y, color=color, radius=radius)
+
+    def add_shapes(self, shapes: Iterable[Shape]) -> None:
+        """Перенести обычные фигуры в хранилище"""
+
+        for shape in shapes:
+            kind = 'circle' if isinstance(shape, Circle) else 'rectangle'
+            self.append(
+                kind, **{name: getattr(shape, name) for name in shape.fields}
+            )
+
+    def extend(self, kind: str, rows: Any) -> None:
+        """Добавить строки другого хранилища того же вида"""
+
+        start = self._reserve(kind, len(rows))
+        self._rows[kind][start:start + len(rows)] = rows
+
+    def move(
+        self, dx: float, dy: float, color: str | None = None
+    ) -> None:
+        """Сдвинуть все фигуры (или только фигуры одного цвета)"""
+
+        for kind in SHAPE_DTYPES:
+            rows = self.rows(kind)
+            if color is None:
+                rows['X'] += dx
+                rows['Y'] += dy
+            else:
+                mask = rows['color'] == self._color_ids.get(color, -1)
+                rows['X'][mask] += dx
+                rows['Y'][mask] += dy
+
+    def filter(self, color: str) -> 'ShapeStore':
+        """Новое хранилище только с фигурами указанного цвета"""
+
+        result = self._empty_like()
+        color_id = self._color_ids.get(color, -1)
+        for kind in SHAPE_DTYPES:
+            rows = self.rows(kind)
+            result.extend(kind, rows[rows['color'] == color_id])
+        return result
+
+    def clone(self, n: int = 1) -> 'ShapeStore':
+        """Новое хранилище, где каждая фигура повторена `n` раз"""
+
+        result = self._empty_like()
+        for kind in SHAPE_DTYPES:
+            result.extend(kind, np.repeat(self.rows(kind), n))
+        return result
+
+    def _empty_like(self) -> 'ShapeStore':
+        return ShapeStore(self.colors)
+
+    def _reserve(self, kind: str, count: int) -> int:
+        """Выделить место под `count` строк и вернуть индекс первой"""
+
+        start = self._sizes[kind]
+        rows = self._rows[kind]
+        if start + count > len(rows):
+            grown = np.empty(max(start + count, 2 * len(rows), 16), rows.dtype)
+            grown[:start] = rows[:start]
+            self._rows[kind] = grown
+        self._sizes[kind] = start + count
+        return start
+
+
 def business_logic(shapes: list[Shape]) -> None:
     # Плюс Прототипа в том, что вы можете клонировать набор объектов, не зная
     # их конкретные классы.
@@ -74,12 +562,71 @@ def business_logic(shapes: list[Shape]) -> None:
         shapes_copy.append(s.clone())
 
 
+def _measure(name: str, clone: Callable[[], list]) -> None:
+    # Время и память меряются отдельными прогонами: tracemalloc сильно
+    # замедляет выделение объектов
+    elapsed = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        clones = clone()
+        elapsed = min(elapsed, time.perf_counter() - start)
+        del clones
+
+    tracemalloc.start()
+    clones = clone()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f'{name}: {elapsed:.3f}s, '
+        f'{peak / len(clones):.0f} bytes per clone'
+    )
+
+
+def benchmark_clone(count: int = 200_000) -> None:
+    circle = Circle()
+    circle.X, circle.Y, circle.color, circle.radius = 10, 10, 'red', 20
+    slotted = SlottedCircle(10, 10, 'red', 20)
+
+    registry = PrototypeRegistry()
+    registry.register('circle', circle)
+
+    _measure('clone()', lambda: [circle.clone() for _ in range(count)])
+    _measure('cow_clone()', lambda: [circle.cow_clone() for _ in range(count)])
+    _measure(
+        'PrototypeRegistry.clone',
+        lambda: [registry.clone('circle') for _ in range(count)],
+    )
+    _measure(
+        'copy.deepcopy',
+        lambda: [copy.deepcopy(circle) for _ in range(count)],
+    )
+    _measure('clone_many', lambda: clone_many([slotted], count))
+
+
+def benchmark_store(count: int = 10_000_000) -> None:
+    store = ShapeStore()
+    store.add_circle(10, 10, 'red', 20)
+    store = store.clone(count)
+
+    start = time.perf_counter()
+    store.move(5, -5)
+    elapsed = time.perf_counter() - start
+    print(f'ShapeStore.move: {len(store)} shapes in {elapsed * 1000:.1f}ms')
+
+
 if __name__ == '__main__':
+    if sys.argv[1:] == ['bench']:
+        benchmark_clone()
+        benchmark_store()
+        sys.exit()
+
     shapes = []
 
     circle: Circle = Circle()
     circle.X = 10
     circle.Y = 10
+    circle.color = 'red'
     circle.radius = 20
     shapes.append(circle)
 
@@ -88,8 +635,25 @@ if __name__ == '__main__':
     shapes.append(another_circle)
 
     rectange: Rectangle = Rectangle()
+    rectange.X = 0
+    rectange.Y = 0
+    rectange.color = 'blue'
     rectange.width = 10
     rectange.height = 20
     shapes.append(rectange)
 
     business_logic(shapes)
+
+    registry = PrototypeRegistry()
+    registry.register('big red circle', circle)
+    templated = [registry.clone('big red circle') for _ in range(10)]
+    templated[0].radius = 40
+    print(f'{registry.diverged} of {registry.clones} clones diverged')
+
+    store = ShapeStore()
+    store.add_shapes(shapes)
+    store.move(1, 1, color='red')
+    print([shape.clone().X for shape in store.filter('red')])
+
+    slotted_shapes = clone_many([SlottedCircle(10, 10, 'red', 20)], 3)
+    print([shape.values() for shape in slotted_shapes])
@@ -1,5 +1,22 @@
+import asyncio
+import functools
+import os
+import re
+import sqlite3
+import sys
+import threading
 import time
-from typing import Self
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Self
+
+
+# Общая блокировка создания экземпляров. Она нужна только при первом
+# обращении: когда экземпляр уже создан, он читается без блокировки.
+_lock = threading.RLock()
 
 
 class Singleton:
@@ -8,32 +25,673 @@ class Singleton:
     _instance: Self | None = None
 
     def __new__(cls, *args, **kwargs) -> Self:
-        if not cls._instance:
-            cls._instance = object.__new__(cls, *args, **kwargs)
-        return cls._instance
+        # Экземпляр ищется в словаре самого класса, чтобы подклассы не
+        # получали экземпляр родителя
+        instance = cls.__dict__.get('_instance')
+        if instance is not None:
+            return instance
+
+        with _lock:
+            # Повторная проверка: пока мы ждали блокировку, другой поток мог
+            # успеть создать экземпляр
+            instance = cls.__dict__.get('_instance')
+            if instance is None:
+                instance = object.__new__(cls)
+                cls._instance = instance
+        return instance
+
+
+class Multiton:
+    """
+    Пул одиночек: по одному экземпляру на каждый ключ.
+
+    Ключ - первый аргумент конструктора, например DSN базы данных.
+    `__init__` выполняется только при создании экземпляра, повторный вызов
+    конструктора с тем же ключом возвращает экземпляр как есть
+    """
+
+    _instances: dict[Hashable, Self] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._instances = {}
+
+        init = cls.__dict__.get('__init__')
+        if init is not None:
+            cls.__init__ = _init_once(init)
+
+    def __new__(cls, key: Hashable, *args, **kwargs) -> Self:
+        instance = cls._instances.get(key)
+        if instance is not None:
+            return instance
+
+        with _lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = object.__new__(cls)
+                cls._instances[key] = instance
+        return instance
+
+    @classmethod
+    def get_instance(cls, key: Hashable) -> Self | None:
+        return cls._instances.get(key)
+
+
+def _init_once(init: Callable[..., None]) -> Callable[..., None]:
+    @functools.wraps(init)
+    def __init__(self, *args, **kwargs) -> None:
+        # Флаг ставится после инициализации самого производного класса,
+        # поэтому вызовы super().__init__() внутри неё проходят
+        if self.__dict__.get('_initialized'):
+            return
+        with _lock:
+            if self.__dict__.get('_initialized'):
+                return
+            init(self, *args, **kwargs)
+            if type(self).__init__ is __init__:
+                self._initialized = True
+
+    return __init__
+
+
+def _subclasses(cls: type) -> list[type]:
+    result = []
+    for subclass in cls.__subclasses__():
+        result.append(subclass)
+        result.extend(_subclasses(subclass))
+    return result
+
+
+def _reset_after_fork() -> None:
+    """
+    Сбросить экземпляры в дочернем процессе после `os.fork`.
+
+    Дочерний процесс не должен пользоваться состоянием родителя (например,
+    его соединениями с БД), а блокировка могла быть захвачена другим потоком
+    в момент форка.
+    """
+
+    global _lock
+    _lock = threading.RLock()
+
+    # У базового класса `_instance` - значение по умолчанию для подклассов,
+    # поэтому оно сбрасывается, а не удаляется
+    Singleton._instance = None
+    for cls in _subclasses(Singleton):
+        if '_instance' in cls.__dict__:
+            del cls._instance
+    for cls in [Multiton, *_subclasses(Multiton)]:
+        cls._instances = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class PoolTimeoutError(TimeoutError):
+    """Не удалось получить соединение из пула за отведённое время"""
+
+
+class PoolClosedError(RuntimeError):
+    """Соединение запрошено у закрытого пула"""
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    size: int
+    idle: int
+    in_use: int
+    max_size: int
+    checkouts: int
+    total_wait: float
+
+    @property
+    def utilization(self) -> float:
+        return self.in_use / self.max_size
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.checkouts if self.checkouts else 0.0
+
+
+def _ping(connection: Any) -> bool:
+    try:
+        connection.execute('SELECT 1')
+    except Exception:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул соединений.
+
+    Держит не меньше `min_size` и не больше `max_size` соединений. Соединения,
+    пролежавшие без дела дольше `max_idle` секунд, закрываются (но не ниже
+    `min_size`), а перед выдачей каждое проверяется `health_check`.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        max_idle: float = 60.0,
+        health_check: Callable[[Any], bool] = _ping,
+    ) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(
+                'Expected 0 <= min_size <= max_size and max_size > 0'
+            )
+
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._health_check = health_check
+
+        self._cond = threading.Condition()
+        self._idle: deque[tuple[Any, float]] = deque()
+        self._size = 0
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._closed = False
+
+        for _ in range(min_size):
+            self._idle.append((factory(), time.monotonic()))
+            self._size += 1
+
+    def acquire(self, timeout: float | None = None) -> Any:
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            connection, create = self._checkout(timeout, deadline)
+
+            if create:
+                try:
+                    connection = self._factory()
+                except BaseException:
+                    self._discard()
+                    raise
+            elif not self._health_check(connection):
+                self._close(connection)
+                self._discard()
+                continue
+
+            with self._cond:
+                self._checkouts += 1
+                self._total_wait += time.monotonic() - start
+            return connection
+
+    def release(self, connection: Any) -> None:
+        with self._cond:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+                return
+            # Пул закрыт, пока соединение было выдано: возвращать его некуда
+            self._size -= 1
+        self._close(connection)
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Any]:
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            return PoolStats(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                max_size=self.max_size,
+                checkouts=self._checkouts,
+                total_wait=self._total_wait,
+            )
+
+    def close(self) -> None:
+        """
+        Закрыть пул.
+
+        Простаивающие соединения закрываются сразу, выданные - при возврате
+        """
+
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            # Ждущие соединения должны узнать, что пул закрыт
+            self._cond.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    def _checkout(
+        self, timeout: float, deadline: float
+    ) -> tuple[Any, bool]:
+        """
+        Взять простаивающее соединение или место под новое.
+
+        Возвращает пару (соединение, нужно ли создать новое)
+        """
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolClosedError('Connection pool is closed')
+
+                self._evict_idle()
+
+                if self._idle:
+                    return self._idle.pop()[0], False
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if (
+                        not self._closed and
+                        not self._idle and
+                        self._size >= self.max_size
+                    ):
+                        raise PoolTimeoutError(
+                            f'No connection available after {timeout}s'
+                        )
+
+    def _evict_idle(self) -> None:
+        # Самые давно освобождённые соединения лежат в начале очереди
+        threshold = time.monotonic() - self.max_idle
+        while (
+            self._idle and
+            self._size > self.min_size and
+            self._idle[0][1] < threshold
+        ):
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self._close(connection)
+
+    def _discard(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    collapsed: int = 0
+    size: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class _CacheEntry:
+    rows: list[tuple]
+    tables: frozenset[str]
+    nbytes: int
+    expires_at: float
+
+
+_WHITESPACE = re.compile(r'\s+')
+_READ_ONLY = re.compile(r'^\s*(select|with)\b', re.IGNORECASE)
+# Имя таблицы: простое или в кавычках, возможно со схемой через точку.
+# За ним может идти псевдоним, но не следующее ключевое слово запроса
+_PART = r'(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|\w+)'
+_NAME = rf'{_PART}(?:\.{_PART})*'
+_KEYWORDS = (
+    r'(?:where|join|on|using|inner|left|right|full|outer|cross|natural|'
+    r'group|order|limit|offset|union|intersect|except|having|window)\b'
+)
+_TABLE_REF = rf'{_NAME}(?:\s+(?:as\s+)?(?!{_KEYWORDS})\w+)?'
+_TABLES = re.compile(
+    rf'\b(?:from|join)\s+({_TABLE_REF}(?:\s*,\s*{_TABLE_REF})*)',
+    re.IGNORECASE,
+)
+_TABLE_NAME = re.compile(_NAME)
+_TABLE_PART = re.compile(_PART)
+
+
+def _tables(sql: str) -> frozenset[str]:
+    """
+    Таблицы из FROM и JOIN запроса: без кавычек и в нижнем регистре.
+
+    Имя со схемой записывается и целиком, и без схемы, чтобы запрос к
+    `main.a` сбрасывался и через `invalidate('a')`
+    """
+
+    tables = set()
+    for references in _TABLES.findall(sql):
+        for reference in references.split(','):
+            name = _TABLE_NAME.match(reference.strip()).group()
+            parts = [
+                re.sub(r'["`\[\]]', '', part).lower()
+                for part in _TABLE_PART.findall(name)
+            ]
+            tables.add('.'.join(parts))
+            tables.add(parts[-1])
+    return frozenset(tables)
+
+
+def _rows_size(rows: list[tuple]) -> int:
+    """Приблизительный размер результата запроса в байтах"""
+
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+    return size
+
+
+class QueryCache:
+    """
+    Кэш результатов читающих запросов.
+
+    Ключ - запрос с нормализованными пробелами и параметры. Кэш ограничен
+    суммарным размером результатов в байтах и вытесняет давно не
+    использованные записи. Одинаковые запросы, пришедшие одновременно,
+    схлопываются в одно обращение к БД.
+    """
+
+    def __init__(
+        self, max_bytes: int = 64 * 2 ** 20, ttl: float = 60.0
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        self._in_flight: dict[tuple, Future] = {}
+        self._bytes = 0
+        self._stats = CacheStats()
+        # Поколения таблиц растут при каждой инвалидации. Результат загрузки,
+        # во время которой поколение сменилось, в кэш не кладётся
+        self._generations: dict[str, int] = {}
+        self._generation = 0
+
+    @staticmethod
+    def normalize(sql: str) -> str:
+        return _WHITESPACE.sub(' ', sql).strip().rstrip(';').rstrip()
+
+    @staticmethod
+    def is_cacheable(sql: str) -> bool:
+        return _READ_ONLY.match(sql) is not None
+
+    def get_or_load(
+        self,
+        sql: str,
+        params: tuple,
+        load: Callable[[], list[tuple]],
+        ttl: float | None = None,
+    ) -> list[tuple]:
+        sql = self.normalize(sql)
+        key = (sql, params)
+        tables = _tables(sql)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats.expirations += 1
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return list(entry.rows)
+
+            self._stats.misses += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                generation = self._snapshot(tables)
+            else:
+                self._stats.collapsed += 1
+
+        if not leader:
+            return list(future.result())
+
+        try:
+            rows = load()
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+
+        entry = _CacheEntry(
+            rows=rows,
+            tables=tables,
+            nbytes=_rows_size(rows),
+            expires_at=time.monotonic() + (self.ttl if ttl is None else ttl),
+        )
+        with self._lock:
+            del self._in_flight[key]
+            fresh = self._snapshot(tables) == generation
+            if fresh and entry.nbytes <= self.max_bytes:
+                self._store(key, entry)
+        future.set_result(rows)
+        return list(rows)
+
+    def invalidate(self, *tables: str) -> int:
+        """Удалить результаты запросов к указанным таблицам"""
+
+        tables = {table.lower() for table in tables}
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.tables & tables
+            ]
+            for key in stale:
+                self._remove(key)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            self._stats.size = len(self._entries)
+            self._stats.bytes = self._bytes
+            return CacheStats(**vars(self._stats))
+
+    def _snapshot(self, tables: frozenset[str]) -> tuple[int, ...]:
+        return self._generation, *(
+            self._generations.get(table, 0) for table in sorted(tables)
+        )
+
+    def _store(self, key: tuple, entry: _CacheEntry) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats.evictions += 1
+
+    def _remove(self, key: tuple) -> None:
+        self._bytes -= self._entries.pop(key).nbytes
+
+
+def _sqlite_connection() -> sqlite3.Connection:
+    # Общая in-memory база: все соединения пула видят одни и те же таблицы
+    return sqlite3.connect(
+        'file:singleton_db?mode=memory&cache=shared',
+        uri=True,
+        check_same_thread=False,
+        # Без неявных транзакций: иначе соединение вернётся в пул с открытой
+        # транзакцией и будет держать блокировку таблицы
+        isolation_level=None,
+    )
 
 
 class Database(Singleton):
     """Класс подключения БД"""
 
+    _pool: ConnectionPool | None = None
+    _cache: QueryCache | None = None
+
     @classmethod
     def get_instance(cls) -> 'Database | None':
-        return cls._instance
+        return cls.__dict__.get('_instance')
+
+    def configure_pool(
+        self, factory: Callable[[], Any] = _sqlite_connection, **options: Any
+    ) -> None:
+        """Заменить пул соединений. Параметры - как у `ConnectionPool`"""
+
+        with _lock:
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = ConnectionPool(factory, **options)
+
+    @property
+    def pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with _lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(_sqlite_connection)
+        return self._pool
+
+    def enable_cache(
+        self, max_bytes: int = 64 * 2 ** 20, ttl: float = 60.0
+    ) -> QueryCache:
+        """Включить кэш результатов читающих запросов"""
+
+        self._cache = QueryCache(max_bytes, ttl)
+        return self._cache
+
+    def disable_cache(self) -> None:
+        self._cache = None
+
+    @property
+    def cache(self) -> QueryCache | None:
+        return self._cache
+
+    def invalidate(self, *tables: str) -> None:
+        """Сбросить закэшированные результаты запросов к таблицам"""
+
+        if self._cache is not None:
+            self._cache.invalidate(*tables)
+
+    def query(
+        self, sql: str, params: tuple = (), ttl: float | None = None
+    ) -> list[tuple]:
+        cache = self._cache
+        if cache is None or not cache.is_cacheable(sql):
+            return self._execute(sql, params)
+        return cache.get_or_load(
+            sql, params, lambda: self._execute(sql, params), ttl
+        )
+
+    def _execute(self, sql: str, params: tuple) -> list[tuple]:
+        with self.pool.connection() as connection:
+            try:
+                rows = connection.execute(sql, params).fetchall()
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+            return rows
 
-    def query(self, sql: str) -> None:
-        print('Executing sql query...')
-        print(sql)
-        time.sleep(.5)
-        print('Done!')
+    async def aquery(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """
+        Асинхронный запрос.
+
+        Драйвер блокирующий, поэтому запрос выполняется в потоке на
+        соединении из пула, а цикл событий в это время свободен
+        """
+
+        return await asyncio.to_thread(self.query, sql, params)
+
+    async def gather(
+        self,
+        queries: Iterable[str | tuple[str, tuple]],
+        limit: int | None = None,
+    ) -> list[list[tuple]]:
+        """
+        Выполнить независимые запросы одновременно.
+
+        Одновременно выполняется не больше `limit` запросов, по умолчанию -
+        не больше, чем соединений в пуле. Результаты идут в порядке запросов.
+        """
+
+        semaphore = asyncio.Semaphore(limit or self.pool.max_size)
+
+        async def run(query: str | tuple[str, tuple]) -> list[tuple]:
+            sql, params = (query, ()) if isinstance(query, str) else query
+            async with semaphore:
+                return await self.aquery(sql, params)
+
+        return await asyncio.gather(*(run(query) for query in queries))
+
+
+class NamedDatabase(Multiton):
+    """Подключение к БД, одно на каждый DSN"""
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
 
 
 if __name__ == '__main__':
     first_database = Database()
 
+    first_database.configure_pool(min_size=1, max_size=4, timeout=1.0)
+
     foo: Database = Database()
     assert foo is first_database
+    foo.query('CREATE TABLE table1 (id INTEGER)')
     foo.query('SELECT * FROM table1')
 
     bar: Database = Database.get_instance()
     assert bar is first_database
-    foo.query('SELECT * FROM table2')
+    print(bar.query('SELECT count(*) FROM table1'))
+    print(bar.pool.stats())
+
+    cache = bar.enable_cache(max_bytes=2 ** 20, ttl=30)
+    bar.query('SELECT count(*)  FROM table1')
+    bar.query('SELECT count(*) FROM table1;')
+    bar.query('INSERT INTO table1 VALUES (1)')
+    bar.invalidate('table1')
+    print(bar.query('SELECT count(*) FROM table1'), cache.stats())
+    bar.disable_cache()
+
+    def slow_connection() -> sqlite3.Connection:
+        connection = _sqlite_connection()
+        connection.create_function('sleep', 1, time.sleep)
+        return connection
+
+    # Пять запросов по 0.5 с выполняются примерно за 0.5 с, а не за 2.5 с
+    bar.configure_pool(slow_connection, max_size=5)
+    start = time.perf_counter()
+    asyncio.run(bar.gather(['SELECT sleep(.5)'] * 5))
+    print(f'{time.perf_counter() - start:.2f}s')
+
+    main_db = NamedDatabase('postgresql://localhost/main')
+    assert main_db is NamedDatabase('postgresql://localhost/main')
+    assert main_db is not NamedDatabase('postgresql://localhost/logs')
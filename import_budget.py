@@ -0,0 +1,51 @@
+"""
+Проверка времени импорта пакетов.
+
+Каждый пакет импортируется в отдельном интерпретаторе с `-X importtime`.
+Если накопленное время импорта пакета превышает бюджет, скрипт завершается
+с ненулевым кодом:
+
+    python import_budget.py [бюджет в миллисекундах]
+"""
+
+import os
+import subprocess
+import sys
+
+
+PACKAGES = ('creational', 'structural', 'behavioral')
+DEFAULT_BUDGET_MS = 10.0
+
+
+def import_time(package: str) -> float:
+    """Накопленное время импорта пакета в миллисекундах"""
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {package}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split('|')
+        if name.strip() == package:
+            return int(cumulative) / 1000
+    raise Exception(f'No import time reported for {package}')
+
+
+def main(budget_ms: float = DEFAULT_BUDGET_MS) -> int:
+    over_budget = False
+
+    for package in PACKAGES:
+        elapsed = import_time(package)
+        status = 'ok' if elapsed <= budget_ms else 'OVER BUDGET'
+        over_budget |= elapsed > budget_ms
+        print(f'{package}: {elapsed:.2f}ms / {budget_ms:.2f}ms {status}')
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*map(float, sys.argv[1:2])))
@@ -0,0 +1,89 @@
+"""
+Структурные паттерны проектирования.
+
+Модули и классы пакета импортируются лениво, при первом обращении к
+атрибуту. Имена, которые встречаются в нескольких модулях пакета
+(например, `Application`), доступны только через модуль.
+"""
+
+import importlib
+
+
+_modules = (
+    'adapter',
+    'bridge',
+    'composite',
+    'decorator',
+    'facade',
+    'flyweight',
+    'proxy',
+)
+
+# Имя класса или функции -> модуль, в котором оно объявлено
+_exports = {
+    'RoundHole': 'adapter',
+    'RoundPeg': 'adapter',
+    'SquarePeg': 'adapter',
+    'SquarePegAdapter': 'adapter',
+    'Device': 'bridge',
+    'Remote': 'bridge',
+    'AdvancedRemote': 'bridge',
+    'TV': 'bridge',
+    'Radio': 'bridge',
+    'Graphic': 'composite',
+    'Dot': 'composite',
+    'Circle': 'composite',
+    'CompoundGraphic': 'composite',
+    'ImageEditor': 'composite',
+    'DataSource': 'decorator',
+    'FileDataSource': 'decorator',
+    'DataSourceDecorator': 'decorator',
+    'EncryptionDecorator': 'decorator',
+    'CompressionDecorator': 'decorator',
+    'SalaryManager': 'decorator',
+    'File': 'facade',
+    'VideoFile': 'facade',
+    'OggCompressionCode': 'facade',
+    'MPEG4CompressionCode': 'facade',
+    'CodecFactory': 'facade',
+    'BitrateReader': 'facade',
+    'AudioMixer': 'facade',
+    'VideoConverter': 'facade',
+    'TreeType': 'flyweight',
+    'TreeFactory': 'flyweight',
+    'Tree': 'flyweight',
+    'SpatialGrid': 'flyweight',
+    'Forest': 'flyweight',
+    'CompactForest': 'flyweight',
+    'SharedTreeTypes': 'flyweight',
+    'ThirdPartyYouTubeLib': 'proxy',
+    'ThirdPartyYouTubeClass': 'proxy',
+    'SlowYouTubeClass': 'proxy',
+    'CachedYouTubeClass': 'proxy',
+    'AsyncYouTubeLib': 'proxy',
+    'AsyncYouTubeClass': 'proxy',
+    'BatchStats': 'proxy',
+    'BatchingYouTubeProxy': 'proxy',
+    'benchmark_batching': 'proxy',
+    'YouTubeManager': 'proxy',
+}
+
+__all__ = [*_modules, *_exports]
+
+
+def __getattr__(name: str) -> object:
+    if name in _modules:
+        return importlib.import_module(f'.{name}', __name__)
+
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    # Следующие обращения не проходят через __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -14,6 +14,25 @@
 """
 
 
+import atexit
+import math
+import multiprocessing
+import random
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from itertools import repeat
+from multiprocessing import shared_memory
 from typing import Any
 
 
@@ -22,10 +41,18 @@ class TreeType:
     color: str
     texture: str
 
-    def __init__(self, name: str, color: str, texture: str) -> None:
+    def __init__(
+        self,
+        name: str,
+        color: str,
+        texture: str,
+        texture_data: bytes | memoryview | None = None,
+    ) -> None:
         self.name = name
         self.color = color
         self.texture = texture
+        # Содержимое текстуры, например пиксели изображения
+        self.texture_data = texture_data
 
     def draw(self, canvas: Any, x: float, y: float) -> None:
         """
@@ -35,6 +62,16 @@ class TreeType:
 
         ...
 
+    def draw_batch(
+        self, canvas: Any, xs: Sequence[float], ys: Sequence[float]
+    ) -> None:
+        """
+        1. Создать картину данного типа, цвета и текстуры один раз
+        2. Нарисовать её на холсте во всех позициях xs[i], ys[i]
+        """
+
+        ...
+
 
 class TreeFactory:
     """
@@ -43,27 +80,80 @@ class TreeFactory:
     Решает когда нужно создать новый объект, когда можно обойтись существующим
     """
 
-    tree_types: list[TreeType] = []
+    # Таблица интернирования: ключ - (name, color, texture), поиск за O(1)
+    tree_types: dict[tuple[str, str, str], TreeType] = {}
+    _lock = threading.Lock()
+    # Сегменты разделяемой памяти, из которых загружены типы. Они открыты до
+    # выхода из процесса: `texture_data` типов ссылается на их память
+    _shared: list['SharedTreeTypes'] = []
 
     @classmethod
-    def get_tree_type(cls, name: str, color: str, texture: str) -> TreeType:
-        tree = None
-
-        for tree_type in cls.tree_types:
-            if (
-                tree_type.name == name and
-                tree_type.color == color and
-                tree_type.texture == texture
-            ):
-                tree = tree_type
-                break
+    def get_tree_type(
+        cls,
+        name: str,
+        color: str,
+        texture: str,
+        texture_data: bytes | memoryview | None = None,
+    ) -> TreeType:
+        """
+        Найти тип в таблице или создать его.
+
+        `texture_data` нужна только при создании типа: у уже известного типа
+        содержимое текстуры не заменяется.
+        """
 
-        if tree is None:
-            tree = TreeType(name, color, texture)
-            cls.tree_types.append(tree)
+        key = (name, color, texture)
+
+        # Уже созданный тип читается без блокировки
+        tree = cls.tree_types.get(key)
+        if tree is not None:
+            return tree
+
+        with cls._lock:
+            tree = cls.tree_types.get(key)
+            if tree is None:
+                tree = TreeType(name, color, texture, texture_data)
+                cls.tree_types[key] = tree
 
         return tree
 
+    @classmethod
+    def use_weak_references(cls, enabled: bool = True) -> None:
+        """
+        Хранить типы по слабым ссылкам.
+
+        Тип, на который больше не ссылается ни одно дерево, удаляется из
+        таблицы сам.
+        """
+
+        table_type = weakref.WeakValueDictionary if enabled else dict
+        with cls._lock:
+            cls.tree_types = table_type(cls.tree_types)
+
+    @classmethod
+    def attach_shared(cls, name: str) -> int:
+        """
+        Заполнить таблицу типами, опубликованными в разделяемой памяти.
+
+        Вызывается в рабочем процессе, например как `initializer` пула
+        процессов: типы берутся из сегмента `name`, а не создаются заново.
+        Уже известные типы не заменяются. Возвращает число добавленных типов.
+        """
+
+        shared = SharedTreeTypes.attach(name)
+        # Представления текстур нужно освободить до закрытия сегмента
+        atexit.register(shared.close)
+        added = 0
+        with cls._lock:
+            cls._shared.append(shared)
+            for index in range(len(shared)):
+                tree_type = shared.resolve(index)
+                key = (tree_type.name, tree_type.color, tree_type.texture)
+                if key not in cls.tree_types:
+                    cls.tree_types[key] = tree_type
+                    added += 1
+        return added
+
 
 # Контекстный объект, из которого выделяют легковес TreeType.
 # В программе могут быть тысячи объектов Tree, так как накладные расходы на их
@@ -83,18 +173,675 @@ class Tree:
         self.tree_type.draw(canvas, self.x, self.y)
 
 
+class SpatialGrid:
+    """
+    Пространственный индекс деревьев: равномерная сетка.
+
+    Дерево хранится в ячейке со стороной `cell_size`, в которую попадают его
+    координаты. Запрос прямоугольника просматривает только пересекающиеся с
+    ним ячейки, а поиск ближайшего - кольца ячеек вокруг точки.
+    """
+
+    def __init__(self, cell_size: float = 64.0) -> None:
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], set[Tree]] = {}
+        self._size = 0
+        # Границы занятых ячеек (i_min, j_min, i_max, j_max). После удаления
+        # крайней ячейки пересчитываются при следующем поиске ближайшего
+        self._bounds: tuple[int, int, int, int] | None = None
+        self._bounds_stale = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, tree: Tree) -> None:
+        key = self.cell_of(tree.x, tree.y)
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cells[key] = set()
+            self._extend_bounds(*key)
+        if tree not in cell:
+            cell.add(tree)
+            self._size += 1
+
+    def remove(self, tree: Tree) -> None:
+        key = self.cell_of(tree.x, tree.y)
+        cell = self._cells.get(key)
+        if cell is None or tree not in cell:
+            raise KeyError(tree)
+
+        cell.remove(tree)
+        self._size -= 1
+        if not cell:
+            del self._cells[key]
+            i_min, j_min, i_max, j_max = self._bounds
+            if key[0] in (i_min, i_max) or key[1] in (j_min, j_max):
+                self._bounds_stale = True
+
+    def trees_in_rect(
+        self, x0: float, y0: float, x1: float, y1: float
+    ) -> Iterator[Tree]:
+        """Деревья в прямоугольнике [x0, x1] x [y0, y1]"""
+
+        (i0, j0), (i1, j1) = self.cell_of(x0, y0), self.cell_of(x1, y1)
+        cells = self._cells
+
+        # Если ячеек в прямоугольнике больше, чем занятых, дешевле пройти
+        # по занятым
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(cells):
+            keys = [
+                (i, j) for i, j in cells if i0 <= i <= i1 and j0 <= j <= j1
+            ]
+        else:
+            keys = [
+                (i, j)
+                for i in range(i0, i1 + 1)
+                for j in range(j0, j1 + 1)
+                if (i, j) in cells
+            ]
+
+        for i, j in keys:
+            # Деревья внутренних ячеек заведомо внутри прямоугольника,
+            # проверять координаты нужно только в граничных
+            if i0 < i < i1 and j0 < j < j1:
+                yield from cells[i, j]
+            else:
+                for tree in cells[i, j]:
+                    if x0 <= tree.x <= x1 and y0 <= tree.y <= y1:
+                        yield tree
+
+    def nearest(self, x: float, y: float) -> Tree | None:
+        if not self._cells:
+            return None
+
+        if self._bounds_stale:
+            self._bounds = None
+            for key in self._cells:
+                self._extend_bounds(*key)
+            self._bounds_stale = False
+
+        ci, cj = self.cell_of(x, y)
+        i_min, j_min, i_max, j_max = self._bounds
+
+        # Кольца ближе первого, касающегося границ занятых ячеек, пусты, а
+        # за последним, накрывающим границы, деревьев нет
+        first = max(0, i_min - ci, ci - i_max, j_min - cj, cj - j_max)
+        last = max(ci - i_min, i_max - ci, cj - j_min, j_max - cj)
+
+        best, best_distance = None, math.inf
+        visited = 0
+        for ring in range(first, last + 1):
+            keys = self._ring(ci, cj, ring, self._bounds)
+            # Если колец набралось больше, чем занятых ячеек, дешевле пройти
+            # по занятым
+            visited += len(keys)
+            if visited > len(self._cells):
+                return self._nearest_in_cells(x, y, best, best_distance)
+
+            for key in keys:
+                for tree in self._cells.get(key, ()):
+                    distance = math.hypot(tree.x - x, tree.y - y)
+                    if distance < best_distance:
+                        best, best_distance = tree, distance
+
+            # Любое дерево за пределами просмотренных колец дальше, чем
+            # ring * cell_size от точки
+            if best_distance <= ring * self.cell_size:
+                break
+
+        return best
+
+    def _nearest_in_cells(
+        self, x: float, y: float, best: Tree | None, best_distance: float
+    ) -> Tree | None:
+        """Поиск ближайшего по занятым ячейкам, от ближних к дальним"""
+
+        size = self.cell_size
+
+        def cell_distance(key: tuple[int, int]) -> float:
+            # Расстояние от точки до ближайшей точки ячейки
+            i, j = key
+            dx = max(i * size - x, 0.0, x - (i + 1) * size)
+            dy = max(j * size - y, 0.0, y - (j + 1) * size)
+            return math.hypot(dx, dy)
+
+        for key in sorted(self._cells, key=cell_distance):
+            if cell_distance(key) >= best_distance:
+                break
+            for tree in self._cells[key]:
+                distance = math.hypot(tree.x - x, tree.y - y)
+                if distance < best_distance:
+                    best, best_distance = tree, distance
+
+        return best
+
+    def _extend_bounds(self, i: int, j: int) -> None:
+        if self._bounds is None:
+            self._bounds = (i, j, i, j)
+            return
+        i_min, j_min, i_max, j_max = self._bounds
+        self._bounds = (
+            min(i_min, i), min(j_min, j), max(i_max, i), max(j_max, j)
+        )
+
+    @staticmethod
+    def _ring(
+        ci: int, cj: int, ring: int, bounds: tuple[int, int, int, int]
+    ) -> list[tuple[int, int]]:
+        """
+        Ячейки на расстоянии ровно `ring` ячеек от (ci, cj).
+
+        Отдаются только ячейки внутри `bounds` (i_min, j_min, i_max, j_max)
+        """
+
+        i_min, j_min, i_max, j_max = bounds
+        if ring == 0:
+            return [(ci, cj)]
+
+        keys = []
+        columns = range(max(ci - ring, i_min), min(ci + ring, i_max) + 1)
+        for j in (cj - ring, cj + ring):
+            if j_min <= j <= j_max:
+                keys.extend((i, j) for i in columns)
+
+        rows = range(max(cj - ring + 1, j_min), min(cj + ring - 1, j_max) + 1)
+        for i in (ci - ring, ci + ring):
+            if i_min <= i <= i_max:
+                keys.extend((i, j) for j in rows)
+        return keys
+
+
 # Классы Tree и Forest являются клиентами Легковеса. При желании их можно
 # слить в один класс, если вам не нужно расширять класс деревьев далее.
 class Forest:
-    trees: set[Tree] = set()
+    trees: set[Tree]
+
+    def __init__(self, cell_size: float = 64.0) -> None:
+        self.trees = set()
+        self.index = SpatialGrid(cell_size)
 
     def plant_tree(
         self, x: float, y: float, name: str, color: str, texture: str
-    ) -> None:
+    ) -> Tree:
         tree_type = TreeFactory.get_tree_type(name, color, texture)
         tree = Tree(x, y, tree_type)
         self.trees.add(tree)
+        self.index.insert(tree)
+        return tree
 
-    def draw(self, canvas: Any) -> None:
-        for tree in self.trees:
+    def remove_tree(self, tree: Tree) -> None:
+        if tree not in self.trees:
+            raise KeyError(tree)
+        self.index.remove(tree)
+        self.trees.remove(tree)
+
+    def trees_in_rect(
+        self, x0: float, y0: float, x1: float, y1: float
+    ) -> Iterator[Tree]:
+        return self.index.trees_in_rect(x0, y0, x1, y1)
+
+    def nearest(self, x: float, y: float) -> Tree | None:
+        return self.index.nearest(x, y)
+
+    def draw(
+        self,
+        canvas: Any,
+        viewport: tuple[float, float, float, float] | None = None,
+    ) -> None:
+        """Нарисовать лес или только деревья в области `viewport`"""
+
+        trees = self.trees if viewport is None else self.trees_in_rect(
+            *viewport
+        )
+        for tree in trees:
             tree.draw(canvas)
+
+    def draw_batched(
+        self,
+        canvas: Any,
+        viewport: tuple[float, float, float, float] | None = None,
+    ) -> None:
+        """Нарисовать деревья одним вызовом `draw_batch` на каждый тип"""
+
+        trees = self.trees if viewport is None else self.trees_in_rect(
+            *viewport
+        )
+        for tree_type, (xs, ys) in _group_by_type(trees).items():
+            tree_type.draw_batch(canvas, xs, ys)
+
+    def draw_tiled(
+        self,
+        canvas: Any,
+        viewport: tuple[float, float, float, float],
+        tiles: tuple[int, int] = (4, 4),
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Нарисовать область `viewport`, разбив её на плитки.
+
+        Каждая плитка рисуется отдельной задачей в пуле `executor` (по
+        умолчанию - пул потоков), деревья внутри плитки группируются по типу.
+        Холст должен допускать рисование из нескольких потоков.
+        """
+
+        x0, y0, x1, y1 = viewport
+        columns, rows = tiles
+        width, height = (x1 - x0) / columns, (y1 - y0) / rows
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor()
+
+        try:
+            futures = [
+                executor.submit(
+                    self._draw_tile,
+                    canvas,
+                    (
+                        x0 + column * width,
+                        y0 + row * height,
+                        x1 if column == columns - 1 else
+                        x0 + (column + 1) * width,
+                        y1 if row == rows - 1 else y0 + (row + 1) * height,
+                    ),
+                    column == columns - 1,
+                    row == rows - 1,
+                )
+                for column in range(columns)
+                for row in range(rows)
+            ]
+            for future in futures:
+                future.result()
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    def _draw_tile(
+        self,
+        canvas: Any,
+        tile: tuple[float, float, float, float],
+        last_column: bool,
+        last_row: bool,
+    ) -> None:
+        x0, y0, x1, y1 = tile
+        # Дерево на общей границе двух плиток рисует только одна из них
+        trees = (
+            tree for tree in self.trees_in_rect(x0, y0, x1, y1)
+            if (last_column or tree.x < x1) and (last_row or tree.y < y1)
+        )
+        for tree_type, (xs, ys) in _group_by_type(trees).items():
+            tree_type.draw_batch(canvas, xs, ys)
+
+
+def _group_by_type(
+    trees: Iterable[Tree],
+) -> dict[TreeType, tuple[array, array]]:
+    """Разложить координаты деревьев по их типам"""
+
+    groups: dict[TreeType, tuple[array, array]] = {}
+    for tree in trees:
+        group = groups.get(tree.tree_type)
+        if group is None:
+            group = groups[tree.tree_type] = (array('d'), array('d'))
+        group[0].append(tree.x)
+        group[1].append(tree.y)
+    return groups
+
+
+class CompactForest:
+    """
+    Лес в виде структуры массивов.
+
+    Вместо объекта `Tree` на каждое дерево хранятся три непрерывных столбца:
+    координаты `x`, `y` и номер типа в таблице `tree_types`. Дерево занимает
+    20 байт.
+    """
+
+    def __init__(self) -> None:
+        self.x = array('d')
+        self.y = array('d')
+        self.type_index = array('I')
+        self.tree_types: list[TreeType] = []
+        self._type_indexes: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.type_index)
+
+    def index_of(self, tree_type: TreeType) -> int:
+        index = self._type_indexes.get(id(tree_type))
+        if index is None:
+            index = self._type_indexes[id(tree_type)] = len(self.tree_types)
+            self.tree_types.append(tree_type)
+        return index
+
+    def plant_tree(
+        self, x: float, y: float, name: str, color: str, texture: str
+    ) -> None:
+        tree_type = TreeFactory.get_tree_type(name, color, texture)
+        self.x.append(x)
+        self.y.append(y)
+        self.type_index.append(self.index_of(tree_type))
+
+    def plant_many(
+        self,
+        xs: Iterable[float],
+        ys: Iterable[float],
+        name: str,
+        color: str,
+        texture: str,
+    ) -> None:
+        """Посадить пачку деревьев одного типа"""
+
+        xs, ys = array('d', xs), array('d', ys)
+        if len(xs) != len(ys):
+            raise ValueError('xs and ys must have the same length')
+
+        index = self.index_of(TreeFactory.get_tree_type(name, color, texture))
+        self.x.extend(xs)
+        self.y.extend(ys)
+        self.type_index.extend(repeat(index, len(xs)))
+
+    def batches(
+        self, size: int = 65536
+    ) -> Iterator[list[tuple[TreeType, float, float]]]:
+        """Отдавать деревья пачками по `size` штук"""
+
+        tree_types = self.tree_types
+        for start in range(0, len(self), size):
+            stop = start + size
+            yield [
+                (tree_types[index], x, y)
+                for index, x, y in zip(
+                    self.type_index[start:stop],
+                    self.x[start:stop],
+                    self.y[start:stop],
+                )
+            ]
+
+    def draw(self, canvas: Any) -> None:
+        for batch in self.batches():
+            for tree_type, x, y in batch:
+                tree_type.draw(canvas, x, y)
+
+    def draw_batched(self, canvas: Any) -> None:
+        """Нарисовать деревья одним вызовом `draw_batch` на каждый тип"""
+
+        groups: dict[int, tuple[array, array]] = {}
+        for index, x, y in zip(self.type_index, self.x, self.y):
+            group = groups.get(index)
+            if group is None:
+                group = groups[index] = (array('d'), array('d'))
+            group[0].append(x)
+            group[1].append(y)
+
+        for index, (xs, ys) in groups.items():
+            self.tree_types[index].draw_batch(canvas, xs, ys)
+
+
+class SharedTreeTypes:
+    """
+    Таблица легковесов `TreeType` в разделяемой памяти.
+
+    Процесс-владелец публикует типы (`publish`), например таблицу
+    `TreeFactory.tree_types`, рабочие процессы подключаются к ним по имени
+    сегмента (`attach`) и получают типы по номеру или сразу заполняют ими
+    свою фабрику (`TreeFactory.attach_shared`). Строки декодируются при
+    первом обращении к типу, а `texture_data` - представление прямо над
+    разделяемой памятью, так что данные текстур существуют в одном
+    экземпляре на все процессы.
+
+    Формат сегмента: число типов, затем на каждый тип четыре пары
+    (смещение, длина) для name, color, texture и texture_data, затем байты.
+    """
+
+    _COUNT = struct.Struct('<Q')
+    _ENTRY = struct.Struct('<8Q')
+
+    def __init__(
+        self, memory: shared_memory.SharedMemory, owner: bool
+    ) -> None:
+        self._memory = memory
+        self._owner = owner
+        self._buffer = memory.buf
+        (self._count,) = self._COUNT.unpack_from(self._buffer)
+        self._types: dict[int, TreeType] = {}
+        self._views: list[memoryview] = []
+
+    @classmethod
+    def publish(
+        cls, tree_types: Iterable[TreeType] | Mapping[Any, TreeType]
+    ) -> 'SharedTreeTypes':
+        if isinstance(tree_types, Mapping):
+            tree_types = list(tree_types.values())
+
+        fields = [
+            (
+                tree_type.name.encode(),
+                tree_type.color.encode(),
+                tree_type.texture.encode(),
+                bytes(tree_type.texture_data or b''),
+            )
+            for tree_type in tree_types
+        ]
+        data_offset = cls._COUNT.size + cls._ENTRY.size * len(fields)
+        size = data_offset + sum(len(part) for row in fields for part in row)
+
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        buffer = memory.buf
+        cls._COUNT.pack_into(buffer, 0, len(fields))
+
+        offset = data_offset
+        for index, row in enumerate(fields):
+            entry = []
+            for part in row:
+                buffer[offset:offset + len(part)] = part
+                entry += (offset, len(part))
+                offset += len(part)
+            cls._ENTRY.pack_into(
+                buffer, cls._COUNT.size + cls._ENTRY.size * index, *entry
+            )
+
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedTreeTypes':
+        # Сегментом владеет публикующий процесс, подключившийся не должен
+        # удалять его при выходе. До Python 3.13 отключить отслеживание
+        # нельзя, но дочерние процессы делят трекер ресурсов с родителем, и
+        # повторная регистрация сегмента ничего не меняет.
+        if sys.version_info >= (3, 13):
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            memory = shared_memory.SharedMemory(name=name)
+        return cls(memory, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> 'SharedTreeTypes':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def resolve(self, index: int) -> TreeType:
+        tree_type = self._types.get(index)
+        if tree_type is None:
+            tree_type = self._types[index] = self._load(index)
+        return tree_type
+
+    def close(self) -> None:
+        """Отключиться от сегмента, владелец также удаляет его"""
+
+        self._types.clear()
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._buffer.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def _load(self, index: int) -> TreeType:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+
+        entry = self._ENTRY.unpack_from(
+            self._buffer, self._COUNT.size + self._ENTRY.size * index
+        )
+        parts = [
+            self._buffer[offset:offset + length]
+            for offset, length in zip(entry[::2], entry[1::2])
+        ]
+        name, color, texture = (bytes(part).decode() for part in parts[:3])
+        for part in parts[:3]:
+            part.release()
+        self._views.append(parts[3])
+
+        return TreeType(name, color, texture, parts[3] or None)
+
+
+def _texture_data(name: str, color: str, texture: str) -> bytes | None:
+    """Содержимое текстуры типа в таблице фабрики текущего процесса"""
+
+    texture_data = TreeFactory.tree_types[name, color, texture].texture_data
+    return None if texture_data is None else bytes(texture_data)
+
+
+def benchmark_memory(trees: int = 1_000_000, types: int = 100) -> None:
+    def plant(forest: Forest | CompactForest) -> None:
+        for i in range(trees):
+            forest.plant_tree(i, -i, f'tree{i % types}', 'green', 'rough')
+
+    for forest in (Forest(), CompactForest()):
+        tracemalloc.start()
+        plant(forest)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{type(forest).__name__}: {size / trees:.1f} bytes per tree')
+
+
+def benchmark_viewport(trees: int = 1_000_000, size: float = 10_000) -> None:
+    forest = Forest()
+    for _ in range(trees):
+        forest.plant_tree(
+            random.uniform(0, size), random.uniform(0, size),
+            'oak', 'green', 'rough',
+        )
+
+    def frame_time(viewport: tuple | None) -> float:
+        # Лучшее из трёх измерений: первый кадр платит за холодный кэш
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            forest.draw(None, viewport)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    full = frame_time(None)
+    print(f'full draw: {len(forest.index)} trees in {full * 1000:.1f}ms')
+
+    for side in (100, 500, 2_000, size):
+        elapsed = frame_time((0, 0, side, side))
+        visible = sum(1 for _ in forest.trees_in_rect(0, 0, side, side))
+        print(
+            f'viewport {side:.0f}x{side:.0f}: {visible} trees '
+            f'in {elapsed * 1000:.1f}ms'
+        )
+
+
+def benchmark_draw(
+    trees: int = 500_000, types: int = 100, size: float = 10_000
+) -> None:
+    forest = Forest()
+    for i in range(trees):
+        forest.plant_tree(
+            random.uniform(0, size), random.uniform(0, size),
+            f'tree{i % types}', 'green', 'rough',
+        )
+    viewport = (0, 0, size, size)
+
+    frames = {
+        'per-tree loop': lambda: forest.draw(None, viewport),
+        'batched by type': lambda: forest.draw_batched(None, viewport),
+        'tiled 4x4': lambda: forest.draw_tiled(None, viewport),
+    }
+    for name, frame in frames.items():
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            frame()
+            times.append(time.perf_counter() - start)
+        print(f'{name}: {min(times) * 1000:.1f}ms per frame')
+
+
+def benchmark_plant(trees: int = 10_000_000, types: int = 10_000) -> None:
+    keys = [
+        (f'tree{i}', f'color{i % 7}', f'texture{i % 13}')
+        for i in range(types)
+    ]
+    forest = CompactForest()
+    plant_tree = forest.plant_tree
+
+    start = time.perf_counter()
+    for i in range(trees):
+        plant_tree(i, -i, *keys[i % types])
+    elapsed = time.perf_counter() - start
+    print(
+        f'planted {len(forest)} trees of {len(forest.tree_types)} types '
+        f'into CompactForest: {elapsed:.2f}s, '
+        f'{elapsed / trees * 1e9:.0f}ns per tree'
+    )
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['bench']:
+        benchmark_plant()
+        benchmark_memory()
+        benchmark_viewport()
+        benchmark_draw()
+        sys.exit()
+
+    forest = Forest()
+    forest.plant_tree(1, 2, 'oak', 'green', 'rough')
+    forest.plant_tree(3, 4, 'oak', 'green', 'rough')
+    assert len(TreeFactory.tree_types) == 1
+    assert forest.nearest(2.5, 3.5).x == 3
+    assert [tree.x for tree in forest.trees_in_rect(0, 0, 2, 2)] == [1]
+    forest.draw_batched(None)
+    forest.draw_tiled(None, (0, 0, 4, 4), tiles=(2, 2))
+
+    compact_forest = CompactForest()
+    compact_forest.plant_many([1, 3, 5], [2, 4, 6], 'oak', 'green', 'rough')
+    print(next(compact_forest.batches()))
+
+    with SharedTreeTypes.publish(compact_forest.tree_types) as shared:
+        with SharedTreeTypes.attach(shared.name) as attached:
+            print(attached.resolve(0).name, len(attached))
+
+    # Рабочие процессы получают таблицу фабрики из разделяемой памяти
+    pixels = bytes(range(256)) * 16
+    TreeFactory.get_tree_type('pine', 'dark green', 'needles', pixels)
+    with SharedTreeTypes.publish(TreeFactory.tree_types) as shared:
+        spawn = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            1,
+            mp_context=spawn,
+            initializer=TreeFactory.attach_shared,
+            initargs=(shared.name,),
+        ) as executor:
+            texture_data = executor.submit(
+                _texture_data, 'pine', 'dark green', 'needles'
+            ).result()
+        assert texture_data == pixels
+        print(
+            f'published {len(TreeFactory.tree_types)} tree types, worker '
+            f'read a {len(texture_data)}-byte texture from shared memory'
+        )
@@ -8,7 +8,13 @@
 
 Является суррогатом другого объекта и контролирует доступ к нему
 """
+import asyncio
+import threading
+import time
 from abc import ABC
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
 from typing import Any
 
 
@@ -36,6 +42,28 @@ class ThirdPartyYouTubeClass(ThirdPartyYouTubeLib):
         print(f'[DOWNLOAD]{id_}')
 
 
+class SlowYouTubeClass(ThirdPartyYouTubeClass):
+    """Локальная подделка сервиса с задержкой ответа и счётчиком вызовов"""
+
+    def __init__(self, latency: float = 0.1) -> None:
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_video_info(self, id_: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return super().get_video_info(id_)
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
 class CachedYouTubeClass(ThirdPartyYouTubeLib):
     """
     Конкретная реализация сервиса.
@@ -44,28 +72,305 @@ class CachedYouTubeClass(ThirdPartyYouTubeLib):
     запроса зависит не только от качества интернет-канала пользователя, но и
     от состояния самого YouTube. Значит, чем больше будет вызов к сервису, тем
     менее отзывчивей станет программа.
+
+    Информация о видео кэшируется отдельно для каждого id: не больше
+    `max_size` записей с вытеснением давно не запрошенных. Запись свежая
+    `ttl` секунд, ещё `stale_while_revalidate` секунд отдаётся устаревшее
+    значение, пока в фоне запрашивается новое. Одновременные запросы одного
+    и того же id приводят к одному обращению к сервису.
     """
 
-    def __init__(self, service: ThirdPartyYouTubeClass) -> None:
+    def __init__(
+        self,
+        service: ThirdPartyYouTubeClass,
+        max_size: int = 1024,
+        ttl: float = 300.0,
+        stale_while_revalidate: float = 60.0,
+    ) -> None:
         self._service = service
         self._list_cache: list = []
-        self._video_cache: None = None
         self.need_reset: bool = False
 
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._video_cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+
     def list_videos(self) -> list:
         if self._list_cache is None or self.need_reset:
             self._list_cache = self._service.list_videos()
         return self._list_cache
 
     def get_video_info(self, id_: str) -> Any:
-        if self._video_cache is None or self.need_reset:
-            self._video_cache = self._service.get_video_info(id_)
-        return self._video_cache
+        with self._lock:
+            entry = None if self.need_reset else self._video_cache.get(id_)
+
+            if entry is not None:
+                now = time.monotonic()
+                if now < entry.fresh_until:
+                    self._video_cache.move_to_end(id_)
+                    self.hits += 1
+                    return entry.value
+
+                if now < entry.stale_until:
+                    self._video_cache.move_to_end(id_)
+                    self.stale_hits += 1
+                    future, leader = self._join_fetch(id_)
+                    if leader:
+                        threading.Thread(
+                            target=self._fetch, args=(id_, future), daemon=True
+                        ).start()
+                    return entry.value
+
+            self.misses += 1
+            future, leader = self._join_fetch(id_)
+
+        if leader:
+            self._fetch(id_, future)
+        return future.result()
 
     def download_video(self, id_: str) -> None:
-        if self._video_cache is None or self.need_reset:
-            self._video_cache = self._service.get_video_info(id_)
-        return self._video_cache
+        return self.get_video_info(id_)
+
+    def invalidate(self, id_: str) -> None:
+        with self._lock:
+            self._video_cache.pop(id_, None)
+
+    def _join_fetch(self, id_: str) -> tuple[Future, bool]:
+        """
+        Присоединиться к запросу id к сервису или начать новый.
+
+        Вызывается под блокировкой. Возвращает future результата и признак
+        того, что запрос должен выполнить вызывающий.
+        """
+
+        future = self._in_flight.get(id_)
+        if future is not None:
+            return future, False
+
+        future = self._in_flight[id_] = Future()
+        return future, True
+
+    def _fetch(self, id_: str, future: Future) -> None:
+        try:
+            value = self._service.get_video_info(id_)
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[id_]
+            future.set_exception(exc)
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            del self._in_flight[id_]
+            self.upstream_calls += 1
+            self._video_cache[id_] = _CacheEntry(
+                value=value,
+                fresh_until=now + self.ttl,
+                stale_until=now + self.ttl + self.stale_while_revalidate,
+            )
+            self._video_cache.move_to_end(id_)
+            while len(self._video_cache) > self.max_size:
+                self._video_cache.popitem(last=False)
+        future.set_result(value)
+
+
+class AsyncYouTubeLib(ABC):
+    """Асинхронный интерфейс удалённого сервиса с пакетным запросом"""
+
+    async def list_videos(self) -> list:
+        raise NotImplementedError
+
+    async def get_video_info(self, id_: str) -> Any:
+        raise NotImplementedError
+
+    async def get_video_infos(self, ids: list[str]) -> dict[str, Any]:
+        raise NotImplementedError
+
+    async def download_video(self, id_: str) -> None:
+        raise NotImplementedError
+
+
+class AsyncYouTubeClass(AsyncYouTubeLib):
+    """
+    Локальная подделка асинхронного сервиса.
+
+    Каждый запрос, одиночный или пакетный, занимает `latency` секунд.
+    """
+
+    def __init__(self, latency: float = 0.05) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    async def list_videos(self) -> list:
+        await asyncio.sleep(self.latency)
+        return ['video1', 'video2', 'video3']
+
+    async def get_video_info(self, id_: str) -> str:
+        return (await self.get_video_infos([id_]))[id_]
+
+    async def get_video_infos(self, ids: list[str]) -> dict[str, str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {id_: f'video[{id_}]: Good video' for id_ in ids}
+
+    async def download_video(self, id_: str) -> None:
+        await asyncio.sleep(self.latency)
+        print(f'[DOWNLOAD]{id_}')
+
+
+@dataclass
+class BatchStats:
+    requests: int = 0
+    coalesced: int = 0
+    batches: int = 0
+    batched_ids: int = 0
+    max_batch_size: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.batched_ids / self.batches if self.batches else 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+
+class BatchingYouTubeProxy(AsyncYouTubeLib):
+    """
+    Заместитель, объединяющий запросы информации о видео в пакеты.
+
+    Вызовы get_video_info, пришедшие в течение `window` секунд, уходят в
+    сервис одним запросом get_video_infos, результаты раздаются ожидающим.
+    Повторные запросы id, который ждёт отправки или уже запрошен,
+    присоединяются к ожидающему.
+    Пакет отправляется раньше, если набралось `max_batch` id.
+    """
+
+    def __init__(
+        self,
+        service: AsyncYouTubeLib,
+        window: float = 0.005,
+        max_batch: int = 100,
+    ) -> None:
+        self._service = service
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[str, asyncio.Future] = {}
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = BatchStats()
+
+    async def list_videos(self) -> list:
+        return await self._service.list_videos()
+
+    async def get_video_info(self, id_: str) -> Any:
+        started = time.perf_counter()
+        self.stats.requests += 1
+
+        future = self._pending.get(id_) or self._in_flight.get(id_)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[id_] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        else:
+            self.stats.coalesced += 1
+
+        try:
+            return await asyncio.shield(future)
+        finally:
+            latency = time.perf_counter() - started
+            self.stats.total_latency += latency
+            self.stats.max_latency = max(self.stats.max_latency, latency)
+
+    async def get_video_infos(self, ids: list[str]) -> dict[str, Any]:
+        infos = [self.get_video_info(id_) for id_ in ids]
+        return dict(zip(ids, await asyncio.gather(*infos)))
+
+    async def download_video(self, id_: str) -> None:
+        await self._service.download_video(id_)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        self._in_flight.update(batch)
+        self.stats.batches += 1
+        self.stats.batched_ids += len(batch)
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: dict[str, asyncio.Future]) -> None:
+        try:
+            infos = await self._service.get_video_infos(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        except BaseException:
+            # Запрос отменён или прерван: ожидающие получают отмену, а не
+            # ждут результата вечно
+            for future in batch.values():
+                if not future.done():
+                    future.cancel()
+            raise
+        finally:
+            for id_ in batch:
+                self._in_flight.pop(id_, None)
+
+        for id_, future in batch.items():
+            if future.done():
+                continue
+            if id_ in infos:
+                future.set_result(infos[id_])
+            else:
+                future.set_exception(KeyError(id_))
+
+
+async def benchmark_batching(n: int = 1000, latency: float = 0.05) -> None:
+    """Сравнить прямые конкурентные запросы с пакетными через заместитель"""
+
+    ids = [str(i % (n // 4)) for i in range(n)]
+
+    service = AsyncYouTubeClass(latency)
+    started = time.perf_counter()
+    await asyncio.gather(*(service.get_video_info(id_) for id_ in ids))
+    direct = time.perf_counter() - started
+    print(f'direct:   {direct * 1e3:7.1f} ms, upstream calls: {service.calls}')
+
+    service = AsyncYouTubeClass(latency)
+    proxy = BatchingYouTubeProxy(service)
+    started = time.perf_counter()
+    await asyncio.gather(*(proxy.get_video_info(id_) for id_ in ids))
+    batched = time.perf_counter() - started
+    stats = proxy.stats
+    print(
+        f'batched:  {batched * 1e3:7.1f} ms, upstream calls: {service.calls}, '
+        f'coalesced: {stats.coalesced}, '
+        f'mean batch: {stats.mean_batch_size:.1f}, '
+        f'mean latency: {stats.mean_latency * 1e3:.1f} ms'
+    )
 
 
 class YouTubeManager:
@@ -92,3 +397,23 @@ if __name__ == '__main__':
     youtube_proxy = CachedYouTubeClass(youtube_service)
     manager = YouTubeManager(youtube_proxy)
     manager.react_on_user_input()
+
+    slow_service = SlowYouTubeClass(latency=0.2)
+    slow_proxy = CachedYouTubeClass(slow_service, max_size=2, ttl=0.5)
+    workers = [
+        threading.Thread(target=slow_proxy.get_video_info, args=('cold',))
+        for _ in range(10)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert slow_service.calls == 1
+
+    assert slow_proxy.get_video_info('a') != slow_proxy.get_video_info('b')
+    print(
+        f'upstream calls: {slow_service.calls}, hits: {slow_proxy.hits}, '
+        f'misses: {slow_proxy.misses}'
+    )
+
+    asyncio.run(benchmark_batching())
@@ -1,3 +1,23 @@
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter, deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from types import TracebackType
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
 class Tree:
     def __init__(self, val: int) -> None:
         self.left: 'Tree | None' = None
@@ -5,34 +25,541 @@ class Tree:
         self.val = val
 
 
-def dfs(root: Tree | None) -> None:
-    if root is None:
-        return
+class TreeWalker:
+    """
+    Итеративный обход дерева.
 
-    print(root.val)
-    dfs(root.left)
-    dfs(root.right)
+    Все обходы - генераторы: узлы отдаются по одному, без рекурсии и без
+    построения промежуточного списка. Посещённые узлы отслеживаются по `id`,
+    поэтому узел, на который ссылаются дважды, отдаётся только один раз.
+    """
 
+    def __init__(self, root: Tree | None) -> None:
+        self.root = root
+
+    def __iter__(self) -> Iterator[Tree]:
+        return self.preorder()
+
+    def preorder(self) -> Iterator[Tree]:
+        if self.root is None:
+            return
+
+        stack: list[Tree] = [self.root]
+        visited: set[int] = set()
+
+        while stack:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+
+            yield node
+
+            # Правый потомок кладётся первым, чтобы левый был снят раньше
+            if node.right is not None:
+                stack.append(node.right)
+            if node.left is not None:
+                stack.append(node.left)
+
+    def inorder(self) -> Iterator[Tree]:
+        stack: list[Tree] = []
+        visited: set[int] = set()
+        node = self.root
+
+        while stack or node is not None:
+            while node is not None and id(node) not in visited:
+                visited.add(id(node))
+                stack.append(node)
+                node = node.left
+
+            if not stack:
+                break
+
+            node = stack.pop()
+
+            yield node
+
+            node = node.right
+
+    def postorder(self) -> Iterator[Tree]:
+        if self.root is None:
+            return
+
+        # Флаг показывает, что потомки узла уже отданы
+        stack: list[tuple[Tree, bool]] = [(self.root, False)]
+        visited: set[int] = set()
+
+        while stack:
+            node, expanded = stack.pop()
+
+            if expanded:
+                yield node
+                continue
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+
+            stack.append((node, True))
+            if node.right is not None:
+                stack.append((node.right, False))
+            if node.left is not None:
+                stack.append((node.left, False))
+
+    def level_order(self) -> Iterator[Tree]:
+        for level in self.levels():
+            yield from level
+
+    def levels(self) -> Iterator[list[Tree]]:
+        """Отдавать дерево уровень за уровнем"""
+
+        if self.root is None:
+            return
+
+        queue: deque[Tree] = deque((self.root,))
+        visited: set[int] = {id(self.root)}
+
+        while queue:
+            level = [queue.popleft() for _ in range(len(queue))]
+
+            for node in level:
+                for child in (node.left, node.right):
+                    if child is not None and id(child) not in visited:
+                        visited.add(id(child))
+                        queue.append(child)
+
+            yield level
+
+
+class ArrayTree:
+    """
+    Компактное дерево в виде структуры массивов.
+
+    Узел - это индекс, а `val`, `left` и `right` хранятся в трёх непрерывных
+    массивах по 8 байт на поле. Отсутствующий потомок обозначается `-1`.
+    Узлы лежат в порядке обхода в ширину, поэтому индекс потомка всегда больше
+    индекса родителя, а корень имеет индекс 0.
+    """
+
+    NONE = -1
+
+    def __init__(self) -> None:
+        self.val: array[int] = array('q')
+        self.left: array[int] = array('q')
+        self.right: array[int] = array('q')
+
+    def __len__(self) -> int:
+        return len(self.val)
+
+    @classmethod
+    def from_tree(cls, root: Tree | None) -> 'ArrayTree':
+        tree = cls()
+        if root is None:
+            return tree
+
+        nodes = list(TreeWalker(root).level_order())
+        index = {id(node): i for i, node in enumerate(nodes)}
+
+        tree.val = array('q', (node.val for node in nodes))
+        tree.left = array('q', (
+            cls.NONE if node.left is None else index[id(node.left)]
+            for node in nodes
+        ))
+        tree.right = array('q', (
+            cls.NONE if node.right is None else index[id(node.right)]
+            for node in nodes
+        ))
+        return tree
+
+    def to_tree(self) -> Tree | None:
+        if not self.val:
+            return None
+
+        nodes = [Tree(val) for val in self.val]
+        for node, left, right in zip(nodes, self.left, self.right):
+            if left != self.NONE:
+                node.left = nodes[left]
+            if right != self.NONE:
+                node.right = nodes[right]
+        return nodes[0]
+
+    def levels(self) -> Iterator[range]:
+        """
+        Отдавать фронты обхода в ширину целиком.
+
+        Узлы одного уровня лежат в массивах подряд, поэтому фронт - это
+        диапазон индексов, а следующий фронт начинается сразу за текущим.
+        """
+
+        none, left, right = self.NONE, self.left, self.right
+        start, end = 0, min(1, len(self.val))
+
+        while start < end:
+            yield range(start, end)
+
+            children = (
+                (end - start) * 2 -
+                left[start:end].count(none) -
+                right[start:end].count(none)
+            )
+            start, end = end, end + children
+
+    def level_order(self) -> Iterator[int]:
+        for frontier in self.levels():
+            yield from self.val[frontier.start:frontier.stop]
+
+    def depths(self) -> array:
+        """Глубина каждого узла, корень на глубине 0"""
+
+        depths = array('q', bytes(8 * len(self.val)))
+        for depth, frontier in enumerate(self.levels()):
+            depths[frontier.start:frontier.stop] = array(
+                'q', (depth,) * len(frontier)
+            )
+        return depths
+
+    def subtree_sums(self) -> array:
+        """
+        Сумма значений в поддереве каждого узла.
+
+        С NumPy каждый фронт складывается целиком, векторными операциями над
+        срезами массивов, без NumPy - по одному узлу
+        """
+
+        # Фронты обрабатываются снизу вверх: к моменту обработки уровня суммы
+        # всех потомков уже посчитаны
+        frontiers = list(self.levels())
+        frontiers.reverse()
+        if np is not None:
+            return self._subtree_sums_numpy(frontiers)
+
+        sums = array('q', self.val)
+        none, left, right = self.NONE, self.left, self.right
+        for frontier in frontiers:
+            for i in frontier:
+                if left[i] != none:
+                    sums[i] += sums[left[i]]
+                if right[i] != none:
+                    sums[i] += sums[right[i]]
+        return sums
+
+    def _subtree_sums_numpy(self, frontiers: list[range]) -> array:
+        sums = np.array(self.val, dtype=np.int64)
+        children = (
+            np.frombuffer(self.left, dtype=np.int64),
+            np.frombuffer(self.right, dtype=np.int64),
+        )
+
+        for frontier in frontiers:
+            level = sums[frontier.start:frontier.stop]
+            for child in children:
+                child = child[frontier.start:frontier.stop]
+                present = child != self.NONE
+                # `level` - представление `sums`, запись идёт прямо в него
+                level[present] += sums[child[present]]
+        return array('q', sums.tobytes())
+
+
+@dataclass
+class TreeStats:
+    """Агрегаты по дереву, которые можно складывать из частей"""
+
+    count: int = 0
+    total: int = 0
+    maximum: int | None = None
+    depth_histogram: Counter[int] = field(default_factory=Counter)
+
+    def add_level(self, depth: int, values: list[int]) -> None:
+        if not values:
+            return
+
+        self.count += len(values)
+        self.total += sum(values)
+        level_max = max(values)
+        if self.maximum is None or level_max > self.maximum:
+            self.maximum = level_max
+        self.depth_histogram[depth] += len(values)
+
+    def merge(self, other: 'TreeStats') -> None:
+        self.count += other.count
+        self.total += other.total
+        if other.maximum is not None and (
+            self.maximum is None or other.maximum > self.maximum
+        ):
+            self.maximum = other.maximum
+        self.depth_histogram.update(other.depth_histogram)
+
+
+def aggregate(root: Tree | None, base_depth: int = 0) -> TreeStats:
+    """Посчитать агрегаты последовательно, уровень за уровнем"""
+
+    stats = TreeStats()
+    for depth, level in enumerate(TreeWalker(root).levels(), base_depth):
+        stats.add_level(depth, [node.val for node in level])
+    return stats
 
-def bfs(root: Tree | None) -> None:
-    queue = [root]
-    visited = []
 
-    while queue:
-        el = queue.pop(0)
+# При запуске через fork дерево не сериализуется вовсе: процессы видят память
+# родителя, а каждая задача получает только путь до своего поддерева. Без fork
+# каждая задача получает своё поддерево в виде ArrayTree: связное дерево
+# pickle обходит рекурсивно и на глубоких деревьях не справляется.
+_worker_root: Tree | None = None
 
-        if el not in visited:
-            visited.append(el)
 
-            if el.left:
-                queue.append(el.left)
-            
-            if el.right:
-                queue.append(el.right)
-    print(list(map(lambda x: x.val, visited)))
+def _init_worker(root: Tree) -> None:
+    global _worker_root
+    _worker_root = root
+
+
+def _subtree_stats(path: str, depth: int) -> TreeStats:
+    node = _worker_root
+    for step in path:
+        node = node.left if step == 'L' else node.right
+    return aggregate(node, depth)
+
+
+def _array_subtree_stats(tree: ArrayTree, depth: int) -> TreeStats:
+    stats = TreeStats()
+    for level, frontier in enumerate(tree.levels(), depth):
+        stats.add_level(level, tree.val[frontier.start:frontier.stop].tolist())
+    return stats
+
+
+def parallel_aggregate(
+    root: Tree | None, split_depth: int = 4, max_workers: int | None = None
+) -> TreeStats:
+    """
+    Посчитать агрегаты в пуле процессов.
+
+    Уровни выше `split_depth` считаются в текущем процессе, а каждое поддерево,
+    растущее с глубины `split_depth`, сворачивается отдельной задачей.
+    """
+
+    stats = TreeStats()
+    frontier: list[tuple[Tree, str]] = [] if root is None else [(root, '')]
+
+    for depth in range(split_depth):
+        if not frontier:
+            return stats
+
+        stats.add_level(depth, [node.val for node, _ in frontier])
+        frontier = [
+            (child, path + step)
+            for node, path in frontier
+            for step, child in (('L', node.left), ('R', node.right))
+            if child is not None
+        ]
+
+    if not frontier:
+        return stats
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(
+            max_workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(root,),
+        ) as pool:
+            paths = [path for _, path in frontier]
+            partials = pool.map(_subtree_stats, paths, repeat(split_depth))
+            for partial in partials:
+                stats.merge(partial)
+        return stats
+
+    with ProcessPoolExecutor(max_workers) as pool:
+        subtrees = (ArrayTree.from_tree(node) for node, _ in frontier)
+        partials = pool.map(
+            _array_subtree_stats, subtrees, repeat(split_depth)
+        )
+        for partial in partials:
+            stats.merge(partial)
+
+    return stats
+
+
+def make_complete_tree(height: int) -> Tree:
+    """Построить полное двоичное дерево, значения - номера узлов"""
+
+    nodes = [Tree(i) for i in range(2 ** height - 1)]
+    for i, node in enumerate(nodes[:len(nodes) // 2]):
+        node.left = nodes[2 * i + 1]
+        node.right = nodes[2 * i + 2]
+    return nodes[0]
+
+
+def benchmark_aggregate(height: int = 21, split_depth: int = 5) -> None:
+    root = make_complete_tree(height)
+
+    start = time.perf_counter()
+    expected = aggregate(root)
+    serial = time.perf_counter() - start
+    print(f'serial: {serial:.3f}s ({expected.count} nodes)')
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        stats = parallel_aggregate(root, split_depth, workers)
+        elapsed = time.perf_counter() - start
+        assert stats == expected
+        print(
+            f'workers={workers}: {elapsed:.3f}s, '
+            f'speedup x{serial / elapsed:.2f}'
+        )
+        workers *= 2
+
+
+# Формат файла дерева: заголовок (сигнатура и число узлов) и записи
+# фиксированной длины `val, left, right` по 8 байт, little-endian. Записи идут
+# в порядке `ArrayTree`, то есть в порядке обхода в ширину.
+TREE_FILE_MAGIC = b'PYTREE\x00\x01'
+_HEADER = struct.Struct('<8sQ')
+_RECORD_FIELDS = 3
+
+
+def dump_tree(root: Tree | None, path: str | os.PathLike) -> None:
+    """Записать дерево в бинарный файл"""
+
+    tree = ArrayTree.from_tree(root)
+    records = array('q', bytes(8 * _RECORD_FIELDS * len(tree)))
+    records[0::_RECORD_FIELDS] = tree.val
+    records[1::_RECORD_FIELDS] = tree.left
+    records[2::_RECORD_FIELDS] = tree.right
+    if sys.byteorder == 'big':
+        records.byteswap()
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(TREE_FILE_MAGIC, len(tree)))
+        f.write(records)
+
+
+class MappedNode:
+    """Узел файла дерева. Поля читаются из отображения при обращении"""
+
+    __slots__ = ('_tree', 'index')
+
+    def __init__(self, tree: 'MappedTree', index: int) -> None:
+        self._tree = tree
+        self.index = index
+
+    @property
+    def val(self) -> int:
+        return self._tree.val[self.index]
+
+    @property
+    def left(self) -> 'MappedNode | None':
+        return self._tree.node(self._tree.left[self.index])
+
+    @property
+    def right(self) -> 'MappedNode | None':
+        return self._tree.node(self._tree.right[self.index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MappedNode):
+            return NotImplemented
+        return self._tree is other._tree and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash(self.index)
+
+
+class MappedTree:
+    """
+    Дерево, отображённое из файла через `mmap`.
+
+    Открытие не читает узлы: `val`, `left` и `right` - это представления
+    над страницами файла, которые подгружаются по мере обращения. Несколько
+    процессов, открывших один файл, разделяют его страничный кэш.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        with open(path, 'rb') as f:
+            # Пустой файл нельзя отобразить, а в файле короче заголовка
+            # нечего проверять
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise ValueError(f'{path} is not a tree file')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count = _HEADER.unpack_from(self._mmap)
+        if magic != TREE_FILE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a tree file')
+        if sys.byteorder == 'big':
+            self._mmap.close()
+            raise NotImplementedError('Big-endian hosts are not supported')
+
+        size = _HEADER.size + 8 * _RECORD_FIELDS * self._count
+        if len(self._mmap) < size:
+            self._mmap.close()
+            raise ValueError(
+                f'{path} is truncated: header declares {self._count} nodes'
+            )
+        self._records = memoryview(self._mmap)[_HEADER.size:size].cast('q')
+        self.val = self._records[0::_RECORD_FIELDS]
+        self.left = self._records[1::_RECORD_FIELDS]
+        self.right = self._records[2::_RECORD_FIELDS]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> 'MappedTree':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in (self.val, self.left, self.right, self._records):
+            view.release()
+        self._mmap.close()
+
+    @property
+    def root(self) -> MappedNode | None:
+        return self.node(0 if self._count else ArrayTree.NONE)
+
+    def node(self, index: int) -> MappedNode | None:
+        if index == ArrayTree.NONE:
+            return None
+        return MappedNode(self, index)
+
+    def levels(self) -> Iterator[range]:
+        """Фронты обхода в ширину, как в `ArrayTree.levels`"""
+
+        none, left, right = ArrayTree.NONE, self.left, self.right
+        start, end = 0, min(1, self._count)
+
+        while start < end:
+            yield range(start, end)
+
+            children = sum(
+                (left[i] != none) + (right[i] != none)
+                for i in range(start, end)
+            )
+            start, end = end, end + children
+
+    def level_order(self) -> Iterator[int]:
+        val = self.val
+        for frontier in self.levels():
+            yield from (val[i] for i in frontier)
+
+
+def dfs(root: Tree | None) -> None:
+    for node in TreeWalker(root).preorder():
+        print(node.val)
+
+
+def bfs(root: Tree | None) -> None:
+    print([node.val for node in TreeWalker(root).level_order()])
 
 
 if __name__ == '__main__':
+    if sys.argv[1:] == ['bench']:
+        benchmark_aggregate()
+        sys.exit()
+
     root = Tree(1)
 
     root.left = Tree(2)
@@ -44,3 +571,13 @@ if __name__ == '__main__':
     root.right.right = Tree(6)
 
     bfs(root)
+
+    compact = ArrayTree.from_tree(root)
+    print(list(compact.level_order()), compact.subtree_sums().tolist())
+
+    print(parallel_aggregate(root, split_depth=1))
+
+    dump_tree(root, 'tree.bin')
+    with MappedTree('tree.bin') as mapped:
+        print(list(mapped.level_order()), mapped.root.right.left.val)
+    os.remove('tree.bin')